@@ -0,0 +1,291 @@
+# Where the page sources come from
+#
+# A backup can be read in any of three forms:
+#   ZipArchive          the zip file which Wikidot's backup produces
+#   DirectoryArchive    a directory the zip has been unpacked into (walked with os.scandir; the pages can optionally be read through mmap)
+#   TarArchive          a tar.gz (or other tar) of such a directory, read as a stream
+# Every backend names its entries the way the zip does, e.g. "source/nav_top.txt", so that the rest of the program (InterestingFilenameZip,
+# ConvertZipCategoryMarker, the page filter, the page cache, graph snapshots) doesn't care which form the backup is in.
+#
+# Each entry also has a stamp which changes whenever the entry does: the CRC for a zip, the modification time for a directory or a tar.
+# The page cache and diff mode use the stamp and the size to tell unchanged pages.  (Stamps from different backends don't match,
+# so switching a backup from one form to another costs one full scan.)
+#
+# Chunks() splits a list of entries into units of work for PageScanner.ScanChunk, each a (backend, entries) pair which can be sent
+# to a worker process.  A zip or a directory can be read anywhere, so the workers read the pages themselves.  A compressed tar can
+# only be read from front to back, so the main process reads it and sends the workers the pages' bytes in a PagesInMemory.
+
+import contextlib
+import io
+import mmap
+import os
+import tarfile
+import zipfile
+import zlib
+
+# The errors which reading a damaged or unreadable backup raises.  The backends turn them into ArchiveErrors.
+archiveErrors=(ValueError, OSError, EOFError, zlib.error, zipfile.BadZipFile, tarfile.TarError)
+
+# Each worker process keeps open the zip file it last read, so that the chunks it is given don't each have to read the zip's directory again.
+# (filepath, the file's modification time, its size, the ZipFile)
+workerZip=None
+
+# The extensions which are dropped from a backup's filename to name it (e.g., for its report directory)
+archiveExtensions=(".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".tar", ".zip")
+
+
+# *****************************************************************
+# Raised when a backup can't be read: it isn't a backup at all, or it's damaged, or it changed while it was being read.
+# Only errors in reading the backup itself are turned into ArchiveErrors, so that (for instance) a failure to write a report isn't mistaken for one.
+class ArchiveError(Exception):
+    pass
+
+
+# Raise any of the archiveErrors raised inside the with block as an ArchiveError, saying what was being read
+# (The page reads, which happen for every page, use ReadingError() in a plain try instead: it's cheaper.)
+@contextlib.contextmanager
+def Reading(what):
+    try:
+        yield
+    except archiveErrors as e:
+        raise ReadingError(what, e) from e
+
+
+def ReadingError(what, e):
+    return ArchiveError(what + ": " + str(e))
+
+
+# *****************************************************************
+# A page being read from a backup.  Errors from the underlying stream (a damaged zip member, say) are raised as ArchiveErrors.
+class PageStream:
+    def __init__(self, stream, what):
+        self.stream=stream
+        self.what=what      # The backup and the entry, for error messages
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stream.close()
+
+    def read(self, size=-1):
+        try:
+            return self.stream.read(size)
+        except archiveErrors as e:
+            raise ReadingError(self.what, e) from e
+
+
+# *****************************************************************
+class ZipArchive:
+    kind="zip"
+
+    def __init__(self, filepath):
+        self.filepath=filepath
+        self.zip=None           # The open ZipFile, while in a with block
+        self.depth=0            # How deeply the with blocks are nested: the inner ones share the outer one's ZipFile
+        self.inWorker=False     # Is this a copy which was sent to a worker process?
+
+    def __enter__(self):
+        if self.depth == 0:
+            with Reading("'" + self.filepath + "'"):
+                self.zip=WorkerZip(self.filepath) if self.inWorker else zipfile.ZipFile(self.filepath)
+        self.depth+=1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth-=1
+        if self.depth == 0:
+            if not self.inWorker:
+                self.zip.close()
+            self.zip=None
+
+    def __getstate__(self):     # An open ZipFile can't be sent to a worker process: the worker opens its own
+        state=self.__dict__.copy()
+        state["zip"]=None
+        state["depth"]=0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.inWorker=True
+
+    # Yield (entry name, stamp, size) for every entry, in zip order
+    def Entries(self):
+        for info in self.zip.infolist():
+            yield info.filename, info.CRC, info.file_size
+
+    def OpenPage(self, entryName):
+        what="'" + self.filepath + "' " + entryName
+        try:
+            return PageStream(self.zip.open(entryName), what)
+        except archiveErrors as e:
+            raise ReadingError(what, e) from e
+
+    def Chunks(self, entries, chunkSize):
+        for i in range(0, len(entries), chunkSize):
+            yield self, entries[i:i+chunkSize]
+
+
+# *****************************************************************
+# The top of the directory tree is the directory holding "source/".  (Pointing at the "source" directory itself works too.)
+# The entries are listed in name order, since the order of a directory listing depends on the filesystem.
+class DirectoryArchive:
+    kind="directory"
+
+    def __init__(self, dirpath, useMmap=False):
+        dirpath=os.path.abspath(dirpath)
+        if os.path.basename(dirpath) == "source" and not os.path.isdir(os.path.join(dirpath, "source")):
+            dirpath=os.path.dirname(dirpath)
+        self.dirpath=dirpath
+        self.useMmap=useMmap        # Read the pages through mmap instead of read()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def Entries(self):
+        entries=[]
+        with Reading("'" + self.dirpath + "'"):
+            self.Walk(self.dirpath, "", entries)
+        entries.sort()
+        return entries
+
+    def Walk(self, dirpath, prefix, entries):
+        with os.scandir(dirpath) as scan:
+            for entry in scan:
+                if entry.is_dir(follow_symlinks=False):
+                    self.Walk(entry.path, prefix+entry.name+"/", entries)
+                elif entry.is_file():
+                    stat=entry.stat()
+                    entries.append((prefix+entry.name, stat.st_mtime_ns, stat.st_size))
+
+    def OpenPage(self, entryName):
+        what="'" + self.dirpath + "' " + entryName
+        try:
+            file=open(os.path.join(self.dirpath, *entryName.split("/")), "rb")
+            if not self.useMmap:
+                return PageStream(file, what)
+            with file:
+                if os.fstat(file.fileno()).st_size == 0:    # An empty file can't be mapped
+                    return io.BytesIO()
+                return PageStream(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), what)
+        except archiveErrors as e:
+            raise ReadingError(what, e) from e
+
+    def Chunks(self, entries, chunkSize):
+        for i in range(0, len(entries), chunkSize):
+            yield self, entries[i:i+chunkSize]
+
+
+# *****************************************************************
+# The members are read in a single pass over the stream, so listing the entries and then scanning them decompresses the tar twice.
+# That's still much cheaper than unpacking it, and nothing is written to disk.
+class TarArchive:
+    kind="tar"
+
+    def __init__(self, filepath):
+        self.filepath=filepath
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    # Yield (entry name, stamp, size) for every file, in tar order.  If a name turns up twice, only the first is used.
+    def Entries(self):
+        seen=set()
+        with Reading("'" + self.filepath + "'"), tarfile.open(self.filepath, "r|*") as tar:
+            for member in tar:
+                name=TarEntryName(member.name)
+                if member.isfile() and name not in seen:
+                    seen.add(name)
+                    yield name, member.mtime, member.size
+
+    # Read the entries' pages from the stream, in tar order (which is the order Entries() gave), chunkSize of them at a time
+    def Chunks(self, entries, chunkSize):
+        nameZips=dict(entries)
+        wanted=set(nameZips)
+        pages={}
+        with Reading("'" + self.filepath + "'"), tarfile.open(self.filepath, "r|*") as tar:
+            for member in tar:
+                name=TarEntryName(member.name)
+                if not member.isfile() or name not in wanted:
+                    continue
+                pages[name]=tar.extractfile(member).read()
+                wanted.discard(name)
+                if len(pages) == chunkSize:
+                    yield PagesInMemory(pages), [(name, nameZips[name]) for name in pages]
+                    pages={}
+        if len(wanted) > 0:
+            raise ArchiveError("'" + self.filepath + "' changed while it was being read: " + str(len(wanted)) + " pages are gone")
+        if len(pages) > 0:
+            yield PagesInMemory(pages), [(name, nameZips[name]) for name in pages]
+
+    def OpenPage(self, entryName):
+        raise ValueError("the pages of a tar can only be read in order (use Chunks())")
+
+
+# The worker process's open ZipFile for filepath, opening it if need be
+def WorkerZip(filepath):
+    global workerZip
+    stat=os.stat(filepath)
+    key=(filepath, stat.st_mtime_ns, stat.st_size)
+    if workerZip == None or workerZip[:3] != key:
+        if workerZip != None:
+            workerZip[3].close()
+        workerZip=key+(zipfile.ZipFile(filepath),)
+    return workerZip[3]
+
+
+# A tar of an unpacked backup usually has the directory's own name (or ".") at the top: drop it so the names match the zip's
+def TarEntryName(name):
+    parts=name.split("/")
+    while len(parts) > 1 and parts[0] in (".", ""):
+        parts=parts[1:]
+    if len(parts) > 2 and parts[0] != "source" and parts[1] == "source":
+        parts=parts[1:]
+    return "/".join(parts)
+
+
+# *****************************************************************
+# Pages which have already been read, as a dictionary of entry name: bytes
+class PagesInMemory:
+    kind="memory"
+
+    def __init__(self, pages):
+        self.pages=pages
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def OpenPage(self, entryName):
+        return io.BytesIO(self.pages[entryName])
+
+
+# *****************************************************************
+# Pick the backend for a backup: a directory, a zip file or a tar file
+# Raises ArchiveError if it's none of them
+def OpenArchive(path, useMmap=False):
+    if os.path.isdir(path):
+        return DirectoryArchive(path, useMmap)
+    with Reading("'" + path + "'"):
+        if zipfile.is_zipfile(path):
+            return ZipArchive(path)
+        if os.path.isfile(path) and tarfile.is_tarfile(path):
+            return TarArchive(path)
+    raise ArchiveError("'" + path + "' is not a zip file, a tar file or a directory")
+
+
+# The name of a backup, for naming its report directory: "2019-09-22.tar.gz" and "2019-09-22/" are both "2019-09-22"
+def ArchiveName(path):
+    name=os.path.basename(os.path.normpath(path))
+    for extension in archiveExtensions:
+        if name.lower().endswith(extension):
+            return name[:-len(extension)]
+    return name
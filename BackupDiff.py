@@ -0,0 +1,252 @@
+# What changed in the wanted pages from one backup to the next
+#
+# A WikiState holds just enough about one backup to be brought up to date with a later one: each zip entry's CRC and size, what each
+# page is (with its names cannonicized), the redirects, and the reference counts by target as written.
+# Update() compares a later backup's zip directory with the state, takes only the pages which were added, changed or deleted, and works
+# out from those pages alone what happened to the reference counts, the missing pages and the backlinks.  The redirects are re-resolved
+# only when a redirect page was among the changes.
+#
+# The counts and the missing pages follow LinkGraph exactly: references are counted by resolved target, a page exists if it is a
+# content page which doesn't share its name with a redirect, and backlinks are by target as written.
+
+import RedirectResolver
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+
+
+# *****************************************************************
+# One page of a WikiState is a tuple (cannonicized name, cannonicized redirect destination or None, tuple of cannonicized references or None)
+# Turn a list of PageRecords into pages, cannonicizing the names in the same order as an analysis does: redirects first, then content pages
+# If names (a NameRegistry) is given, the names are noted in it.
+def PagesFromRecords(records, names=None):
+    if names == None:
+        names=WikidotHelpers.NameRegistry()     # A throwaway
+    pages={}
+    for record in records:
+        if record.redirect != None:
+            target=names.AddWritten(record.redirect)
+            pages[record.zipEntryName]=(names.AddPageName(record.nameZip), target, None)
+    for record in records:
+        if record.redirect == None:
+            pages[record.zipEntryName]=(names.AddPageName(record.nameZip), None, None)
+    for record in records:
+        if record.redirect == None and record.refs != None:
+            pages[record.zipEntryName]=(pages[record.zipEntryName][0], None, tuple(names.AddWritten(ref) for ref in record.refs))
+    return pages
+
+
+# *****************************************************************
+# The references a page contributes to the counts: none at all if it's a redirect, an empty page, or shadowed by a redirect of the same name
+def Contribution(page, redirects):
+    if page == None or page[1] != None or page[2] == None or page[0] in redirects:
+        return ()
+    return page[2]
+
+
+# *****************************************************************
+class WikiState:
+    def __init__(self):
+        self.label=None             # Where the state came from: the backup's file path, or a snapshot's
+        self.entries={}             # Zip entry name -> (CRC, size)
+        self.pages={}               # Zip entry name -> page (see PagesFromRecords), in zip order
+        self.redirects={}           # Cannonicized name -> cannonicized name it redirects to, as written
+        self.resolved={}            # The redirects, resolved to the ends of their chains
+        self.redirectReport=RedirectResolver.RedirectReport()
+        self.contentEntries={}      # Cannonicized name -> list of the zip entry names of the content pages with that name
+        self.rawCounts={}           # Cannonicized name as written -> number of references to it
+        self.names=None             # The NameRegistry in which the names of the pages scanned by Update() are noted (None means they aren't)
+
+    # Build a state from a backup's entries (a list of (zipEntryName, nameZip, crc, size)) and its PageRecords
+    @classmethod
+    def FromRecords(cls, label, entries, records, names=None):
+        state=cls()
+        state.label=label
+        state.names=names
+        state.SetPages({entry[0]: (entry[2], entry[3]) for entry in entries}, PagesFromRecords(records, names))
+        return state
+
+    # Replace the pages wholesale and work out everything else from them
+    def SetPages(self, entries, pages):
+        self.entries=entries
+        self.pages=pages
+        self.redirects={}
+        self.contentEntries={}
+        for zipEntryName, page in pages.items():
+            if page[1] != None:
+                self.redirects[page[0]]=page[1]
+            else:
+                self.contentEntries.setdefault(page[0], []).append(zipEntryName)
+        self.resolved, self.redirectReport=RedirectResolver.ResolveRedirects(self.redirects)
+        self.rawCounts={}
+        for page in pages.values():
+            for ref in Contribution(page, self.redirects):
+                self.rawCounts[ref]=self.rawCounts.get(ref, 0)+1
+
+    # *****************************************************************
+    # Looking things up
+
+    def Resolve(self, name):
+        return self.resolved.get(name, name)
+
+    def Exists(self, name):
+        return name in self.contentEntries and name not in self.redirects
+
+    # The number of references to a page, after following redirects
+    def RefCount(self, name):
+        count=0
+        if name not in self.resolved:
+            count=self.rawCounts.get(name, 0)
+        for source in self.redirectReport.redirectsTo.get(name, ()):
+            count+=self.rawCounts.get(source, 0)
+        return count
+
+    def IsMissing(self, name):
+        return not self.Exists(name) and self.RefCount(name) > 0
+
+    # *****************************************************************
+    # Which of a later backup's entries (a list of (zipEntryName, nameZip, crc, size)) need to be scanned?
+    def ChangedEntries(self, entries):
+        return [entry for entry in entries if self.entries.get(entry[0]) != (entry[2], entry[3])]
+
+    # Bring the state up to date with a later backup, given its entries and the PageRecords of its ChangedEntries()
+    # Returns a WikiDelta saying what changed
+    def Update(self, label, entries, records):
+        delta=WikiDelta(self.label, label)
+
+        # The new set of pages.  Unchanged pages are carried over as they are.
+        scanned=PagesFromRecords(records, self.names)
+        newEntries={}
+        newPages={}
+        touched=[]          # The entries which were added, changed or deleted
+        for zipEntryName, nameZip, crc, size in entries:
+            newEntries[zipEntryName]=(crc, size)
+            page=scanned.get(zipEntryName)
+            if page == None:
+                newPages[zipEntryName]=self.pages[zipEntryName]
+                continue
+            newPages[zipEntryName]=page
+            touched.append(zipEntryName)
+            if zipEntryName in self.pages:
+                delta.countChanged+=1
+            else:
+                delta.countAdded+=1
+        for zipEntryName in self.pages:
+            if zipEntryName not in newEntries:
+                touched.append(zipEntryName)
+                delta.countDeleted+=1
+
+        # The redirects need redoing only if a redirect page was added, changed or deleted
+        redirects=self.redirects
+        resolved=self.resolved
+        redirectReport=self.redirectReport
+        shadowed=[]         # Untouched content pages which have become (or stopped being) shadowed by a redirect
+        if any(page != None and page[1] != None for e in touched for page in (self.pages.get(e), newPages.get(e))):
+            redirects={page[0]: page[1] for page in newPages.values() if page[1] != None}
+            resolved, redirectReport=RedirectResolver.ResolveRedirects(redirects)
+            touchedSet=set(touched)
+            for name in self.redirects.keys() ^ redirects.keys():
+                shadowed.extend(e for e in self.contentEntries.get(name, ()) if e not in touchedSet)
+
+        # The changes in the references as written, and the names whose existence may have changed
+        rawDeltas={}
+        names=set()
+        for zipEntryName in touched+shadowed:
+            oldPage=self.pages.get(zipEntryName)
+            newPage=newPages.get(zipEntryName)
+            oldRefs=Contribution(oldPage, self.redirects)
+            newRefs=Contribution(newPage, redirects)
+            for ref in oldRefs:
+                rawDeltas[ref]=rawDeltas.get(ref, 0)-1
+            for ref in newRefs:
+                rawDeltas[ref]=rawDeltas.get(ref, 0)+1
+            oldRefs=set(oldRefs)
+            newRefs=set(newRefs)
+            for ref in newRefs-oldRefs:
+                delta.gainedLinks.setdefault(ref, []).append(newPage[0])
+            for ref in oldRefs-newRefs:
+                delta.lostLinks.setdefault(ref, []).append(oldPage[0])
+            for page in (oldPage, newPage):
+                if page != None:
+                    names.add(page[0])
+
+        # The pages whose counts or existence may have changed: the (old and new) resolved targets of the changed references,
+        # of any referenced redirect which now resolves differently, and the touched pages themselves
+        affected=set()
+        for name in rawDeltas:
+            affected.add(self.Resolve(name))
+            affected.add(resolved.get(name, name))
+        if redirects is not self.redirects:
+            for name in self.redirects.keys() | redirects.keys():
+                if self.resolved.get(name, name) != resolved.get(name, name) and (name in self.rawCounts or name in rawDeltas):
+                    affected.add(self.Resolve(name))
+                    affected.add(resolved.get(name, name))
+                    names.add(name)
+        affected|=names
+        before={name: (self.RefCount(name), self.Exists(name)) for name in affected}
+        delta.removedLinks=[name for name in delta.lostLinks if self.IsMissing(self.Resolve(name))]
+
+        # Commit the changes
+        for zipEntryName in touched:
+            oldPage=self.pages.get(zipEntryName)
+            if oldPage != None and oldPage[1] == None:
+                sameName=self.contentEntries[oldPage[0]]
+                sameName.remove(zipEntryName)
+                if len(sameName) == 0:
+                    del self.contentEntries[oldPage[0]]
+            newPage=newPages.get(zipEntryName)
+            if newPage != None and newPage[1] == None:
+                self.contentEntries.setdefault(newPage[0], []).append(zipEntryName)
+        for name, change in rawDeltas.items():
+            count=self.rawCounts.get(name, 0)+change
+            if count == 0:
+                self.rawCounts.pop(name, None)
+            else:
+                self.rawCounts[name]=count
+        self.label=label
+        self.entries=newEntries
+        self.pages=newPages
+        self.redirects=redirects
+        self.resolved=resolved
+        self.redirectReport=redirectReport
+
+        for name in sorted(affected):
+            oldCount, oldExists=before[name]
+            newCount=self.RefCount(name)
+            newExists=self.Exists(name)
+            if (oldCount, oldExists) != (newCount, newExists):
+                delta.changes.append((name, oldCount, newCount, oldExists, newExists))
+        delta.brokenLinks=[name for name in delta.gainedLinks if self.IsMissing(self.Resolve(name))]
+        return delta
+
+
+# *****************************************************************
+# What changed between two states
+class WikiDelta:
+    def __init__(self, oldLabel, newLabel):
+        self.oldLabel=oldLabel
+        self.newLabel=newLabel
+        self.countAdded=0           # Zip entries added, changed and deleted
+        self.countChanged=0
+        self.countDeleted=0
+        self.changes=[]             # (name, old count, new count, existed before, exists now) for each page whose count or existence changed
+        self.gainedLinks={}         # Target as written -> list of the names of pages which now link to it and didn't before
+        self.lostLinks={}           # Target as written -> list of the names of pages which linked to it and no longer do
+        self.brokenLinks=[]         # The targets in gainedLinks which lead to missing pages
+        self.removedLinks=[]        # The targets in lostLinks which led to missing pages
+
+    # Pages which are wanted now but weren't before, as (name, new count)
+    def NewlyWanted(self):
+        return [(name, newCount) for name, oldCount, newCount, oldExists, newExists in self.changes
+                if newCount > 0 and not newExists and not (oldCount > 0 and not oldExists)]
+
+    # Pages which were and still are wanted, but with a different reference count, as (name, old count, new count)
+    def CountChanges(self):
+        return [(name, oldCount, newCount) for name, oldCount, newCount, oldExists, newExists in self.changes
+                if oldCount > 0 and not oldExists and newCount > 0 and not newExists]
+
+    # Wanted pages which have been created, as (name, count)
+    def Created(self):
+        return [(name, newCount) for name, oldCount, newCount, oldExists, newExists in self.changes if oldCount > 0 and not oldExists and newExists]
+
+    # Wanted pages which are no longer referenced at all, as (name, old count)
+    def NoLongerWanted(self):
+        return [(name, oldCount) for name, oldCount, newCount, oldExists, newExists in self.changes if oldCount > 0 and not oldExists and newCount == 0 and not newExists]
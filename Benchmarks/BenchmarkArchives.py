@@ -0,0 +1,61 @@
+# Throughput of each archive backend: the same synthetic backup read as a zip, as an unpacked directory (with and without mmap) and as a tar.gz
+# Run from the top of the repository:  python -m Benchmarks.BenchmarkArchives [pages] [workers]
+#
+# Each backend is timed listing the entries and scanning every page, in-process and with a warm pool of worker processes.
+# The throughput is in MB of page source per second.  (Reading a directory straight after writing it reads from the OS's file cache.)
+
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import Archives
+import PageScanner
+import WantedPagesEnumerator
+from Benchmarks import SyntheticBackup
+
+
+# *****************************************************************
+# List and scan the whole backup.  Returns (seconds, ScanStats, records)
+def Measure(archive, workers, pool):
+    stats=PageScanner.ScanStats()
+    start=time.perf_counter()
+    entries=WantedPagesEnumerator.ListEntries(archive)
+    records=PageScanner.ScanArchive(archive, [entry[:2] for entry in entries], workers=workers, pool=pool, stats=stats)
+    return time.perf_counter()-start, stats, records
+
+
+def Main(pages=50000, workers=None):
+    workers=workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as workDir:
+        zipFilepath=os.path.join(workDir, "synthetic.zip")
+        dirpath=os.path.join(workDir, "synthetic")
+        tarFilepath=os.path.join(workDir, "synthetic.tar.gz")
+        SyntheticBackup.WriteSyntheticBackup(zipFilepath, SyntheticBackup.SyntheticWikiOptions(pages=pages))
+        with zipfile.ZipFile(zipFilepath) as zip:
+            zip.extractall(dirpath)
+        with tarfile.open(tarFilepath, "w:gz") as tar:
+            tar.add(dirpath, arcname="synthetic")
+
+        backends=[("zip", Archives.ZipArchive(zipFilepath)),
+                  ("directory", Archives.DirectoryArchive(dirpath)),
+                  ("directory+mmap", Archives.DirectoryArchive(dirpath, useMmap=True)),
+                  ("tar.gz", Archives.TarArchive(tarFilepath))]
+        print("%d pages; zip %.1f MB, tar.gz %.1f MB" % (pages, os.path.getsize(zipFilepath)/1e6, os.path.getsize(tarFilepath)/1e6))
+        expected=None
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pool.submit(os.getpid).result()     # Start the pool before the timings
+            for label, archive in backends:
+                for scanWorkers in (1, workers):
+                    elapsed, stats, records=Measure(archive, scanWorkers, pool)
+                    found=sorted((record.zipEntryName, record.redirect, record.refs or []) for record in records)     # (A directory's entries come in name order)
+                    if expected == None:
+                        expected=found
+                    print("%-15s %2d workers  %7.2fs  %7.1f MB/s  %8.0f pages/s%s" % (label, scanWorkers, elapsed, stats.bytesRead/1e6/elapsed, stats.countPages/elapsed,
+                                                                              "" if found == expected else "  (different results!)"))
+
+
+if __name__ == "__main__":
+    Main(*[int(arg) for arg in sys.argv[1:]])
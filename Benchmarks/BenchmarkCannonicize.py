@@ -0,0 +1,62 @@
+# Microbenchmark for the cannonicization layer in WikidotHelpers
+# Run from the top of the repository:  python -m Benchmarks.BenchmarkCannonicize
+
+import random
+import time
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+
+
+# *****************************************************************
+# The character-at-a-time cannonicizer we used to use, kept here for comparison
+def LegacyCannonicizeString(name):
+    out=[]
+    inJunk=False
+    for c in name:
+        if c in WikidotHelpers.funnyForeignCharacters.keys():
+            c=WikidotHelpers.funnyForeignCharacters[c]
+        if c.isalnum() or c == ':':
+            if inJunk:
+                out.append("-")
+            out.append(c)
+            inJunk=False
+        else:
+            inJunk=True
+    canname="".join(out)
+    if len(canname) > 1 and canname[0] == "-":
+        canname=canname[1:]
+    return canname
+
+
+# *****************************************************************
+# A list of names in which popular names recur, as they do in a real wiki's references
+def MakeNames(count, distinct, seed=1):
+    rng=random.Random(seed)
+    words=["John", "Smith", "Worldcon", "Émile", "Zoë", "NESFA", "1984", "fan", "con", "Bob's", "(fan)", "--", "Hugo Award"]
+    pool=[" ".join(rng.choice(words) for i in range(rng.randint(1, 4))) for j in range(distinct)]
+    return [pool[min(int(rng.paretovariate(1.2)), distinct)-1] for i in range(count)]
+
+
+def Time(fn, names):
+    start=time.perf_counter()
+    for name in names:
+        fn(name)
+    return time.perf_counter()-start
+
+
+def Main(count=1000000, distinct=20000):
+    names=MakeNames(count, distinct)
+
+    mismatches=sum(1 for name in set(names) if LegacyCannonicizeString(name) != WikidotHelpers.CannonicizeString(name))
+    print("names:", count, " distinct:", len(set(names)), " mismatches against the legacy cannonicizer (should be 0):", mismatches)
+
+    WikidotHelpers.CannonicizeString.cache_clear()
+    print("%-30s %.3fs" % ("legacy", Time(LegacyCannonicizeString, names)))
+    print("%-30s %.3fs" % ("table-driven, uncached", Time(WikidotHelpers.CannonicizeString.__wrapped__, names)))
+    print("%-30s %.3fs" % ("table-driven, memoized", Time(WikidotHelpers.CannonicizeString, names)))
+    print("%-30s %.3fs" % ("CannonicizeZipName", Time(WikidotHelpers.CannonicizeZipName, names)))
+    for name, info in WikidotHelpers.CannonicizeCacheInfo().items():
+        print(name, info)
+
+
+if __name__ == "__main__":
+    Main()
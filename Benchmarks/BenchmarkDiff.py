@@ -0,0 +1,59 @@
+# Time diff mode over a series of weekly backups, against analyzing every backup in full
+# Run from the top of the repository:  python -m Benchmarks.BenchmarkDiff [pages] [weeks]
+#
+# The weekly backups are made from a synthetic backup by editing, deleting and adding a few percent of the pages each week.
+
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+import WantedPagesEnumerator
+from Benchmarks import SyntheticBackup
+
+
+# *****************************************************************
+# Write the next week's backup: about editRatio of the pages are edited, and a tenth as many each deleted and added
+def WriteNextWeek(previousFilepath, zipFilepath, week, editRatio=0.03):
+    rng=random.Random(week)
+    with zipfile.ZipFile(previousFilepath) as previous, zipfile.ZipFile(zipFilepath, "w", compression=zipfile.ZIP_DEFLATED) as zip:
+        for info in previous.infolist():
+            r=rng.random()
+            if r < editRatio/10:
+                continue
+            source=previous.read(info)
+            if r < editRatio and not source.startswith(b"[[module"):
+                source+=(" [[[Wanted In Week %d]]] [[[Missing Page %d]]]" % (week, rng.randrange(100))).encode("utf-8")
+            zip.writestr(info, source)
+        for i in range(int(len(previous.infolist())*editRatio/10)):
+            zip.writestr("source/week-%d-page-%d.txt" % (week, i), "+ New page [[[Missing Page %d]]] [[[Wanted In Week %d]]]" % (rng.randrange(100), week-1))
+
+
+def Main(pages=20000, weeks=8):
+    options=WantedPagesEnumerator.AnalysisOptions(workers=1, rankImportance=False)     # (Diff mode doesn't rank importance)
+    with tempfile.TemporaryDirectory() as workDir:
+        archives=[os.path.join(workDir, "week-0.zip")]
+        SyntheticBackup.WriteSyntheticBackup(archives[0], SyntheticBackup.SyntheticWikiOptions(pages=pages))
+        for week in range(1, weeks):
+            archives.append(os.path.join(workDir, "week-%d.zip" % week))
+            WriteNextWeek(archives[-2], archives[-1], week)
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start=time.perf_counter()
+            for zipFilepath in archives:
+                WantedPagesEnumerator.Analyze(zipFilepath, options)
+            full=time.perf_counter()-start
+
+            start=time.perf_counter()
+            WantedPagesEnumerator.DiffArchives(archives, options, workDir)
+            diff=time.perf_counter()-start
+
+    print("%d weekly backups of %d pages" % (weeks, pages))
+    print("full analysis of each: %7.2fs" % full)
+    print("diff mode:             %7.2fs  (%.2fs per backup)" % (diff, diff/weeks))
+
+
+if __name__ == "__main__":
+    Main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,63 @@
+# Throughput benchmark for ReferenceExtractor, in MB/s of page source
+# Run from the top of the repository:  python -m Benchmarks.BenchmarkExtractor
+
+import random
+import time
+import ReferenceExtractor
+
+
+# *****************************************************************
+# Make a page of roughly the given size with a reference every linkEvery characters or so
+def MakePageSource(size, linkEvery=200, seed=1):
+    rng=random.Random(seed)
+    words=["fan", "con", "Worldcon", "fanzine", "Émile", "NESFA", "1984", "the", "and", "LASFS"]
+    forms=["[[[%s]]]", "[[[%s|some text]]]", "[[[[%s]]]]", "[[[*http://example.com/%s]]]", "[[[%s#anchor]]]"]
+    out=[]
+    length=0
+    while length < size:
+        text=" ".join(rng.choice(words) for i in range(linkEvery//6))
+        link=rng.choice(forms) % (rng.choice(words)+" "+rng.choice(words))
+        out.append(text)
+        out.append(link)
+        length+=len(text)+len(link)
+    return " ".join(out)
+
+
+# *****************************************************************
+# The pre-regex extraction loop, kept here for comparison
+def LegacyExtract(source):
+    refs=[]
+    for r in source.split("[[["):
+        if r.find("]]]") < 1:
+            continue
+        ref=r.split("]]]")
+        if ref[0].find("|") > 0:
+            ref[0]=ref[0][:ref[0].find("|")]
+        if ref[0].find("http:") > 0:
+            continue
+        refs.append(ref[0])
+    return refs
+
+
+# *****************************************************************
+def Time(fn, pages, repeat):
+    best=None
+    for i in range(repeat):
+        start=time.perf_counter()
+        for page in pages:
+            fn(page)
+        elapsed=time.perf_counter()-start
+        best=elapsed if best == None else min(best, elapsed)
+    return best
+
+
+def Main(pageCount=2000, pageSize=20000, repeat=3):
+    pages=[MakePageSource(pageSize, seed=i) for i in range(pageCount)]
+    megabytes=sum(len(p.encode("utf-8")) for p in pages)/1e6
+    for label, fn in (("regex extractor", ReferenceExtractor.ExtractTargets), ("legacy split loop", LegacyExtract)):
+        elapsed=Time(fn, pages, repeat)
+        print("%-18s %8.1f MB/s  (%.1f MB in %.3fs)" % (label, megabytes/elapsed, megabytes, elapsed))
+
+
+if __name__ == "__main__":
+    Main()
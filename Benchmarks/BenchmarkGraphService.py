@@ -0,0 +1,52 @@
+# Query latency of GraphService over HTTP, against a graph snapshot of a synthetic backup
+# Run from the top of the repository:  python -m Benchmarks.BenchmarkGraphService [pages] [queries]
+
+import contextlib
+import http.client
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+import GraphService
+import GraphSnapshot
+import WantedPagesEnumerator
+from Benchmarks import SyntheticBackup
+
+
+def Main(pages=20000, queries=500):
+    with tempfile.TemporaryDirectory() as workDir:
+        zipFilepath=os.path.join(workDir, "synthetic.zip")
+        snapshotFilepath=os.path.join(workDir, "snapshot.sqlite")
+        SyntheticBackup.WriteSyntheticBackup(zipFilepath, SyntheticBackup.SyntheticWikiOptions(pages=pages))
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result=WantedPagesEnumerator.Analyze(zipFilepath, WantedPagesEnumerator.AnalysisOptions(keepState=True))
+        start=time.perf_counter()
+        GraphSnapshot.SaveSnapshot(result.state, snapshotFilepath, result.names)
+        print("%d pages: snapshot saved in %.2fs, %.1f MB" % (pages, time.perf_counter()-start, os.path.getsize(snapshotFilepath)/1e6))
+
+        server=GraphService.MakeServer(snapshotFilepath, 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            connection=http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+            rng=random.Random(1)
+            names=[result.graph.Name(id) for id in rng.sample(range(result.graph.CountNames()), min(queries, result.graph.CountNames()))]
+            for path in ("/backlinks", "/links", "/resolve", "/wanted", "/name"):
+                times=[]
+                for name in names:
+                    start=time.perf_counter()
+                    connection.request("GET", path+"?page="+quote(name))
+                    connection.getresponse().read()
+                    times.append(time.perf_counter()-start)
+                times.sort()
+                print("%-11s median %6.2f ms   99th percentile %6.2f ms" % (path, times[len(times)//2]*1000, times[len(times)*99//100]*1000))
+            connection.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    Main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,73 @@
+# Compare scanning whole pages (read, decode, then extract) with streaming them through the byte-level extractor
+# Reports the time taken and the peak traced memory while scanning a zip of large pages.
+# (The whole-page scan's peak is at least one page's bytes plus its decoded text; the streamed scan's stays around one read chunk.)
+# Run from the top of the repository:  python -m Benchmarks.BenchmarkLargePages [pageCount] [pageSizeMB]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+import Archives
+import PageScanner
+import ReferenceExtractor
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+from Benchmarks.BenchmarkExtractor import MakePageSource
+
+
+# *****************************************************************
+# Write a zip of large pages.  Half of them have references; the other half (think long tables and transcripts) have none.
+def WriteLargePages(zipFilepath, pageCount, pageSize):
+    with zipfile.ZipFile(zipFilepath, "w", compression=zipfile.ZIP_DEFLATED) as zip:
+        for i in range(pageCount):
+            source=MakePageSource(pageSize, seed=i)
+            if i % 2 == 1:
+                source=source.replace("[[[", "(((").replace("]]]", ")))")
+            zip.writestr("source/large-page-%d.txt" % i, source)
+
+
+# *****************************************************************
+# How we used to scan a page: read and decode all of it, check for a redirect, then extract
+def ScanPageWhole(archive, zipEntryName, nameZip, stats):
+    source=WikidotHelpers.ReadPageSourceFromZip(archive.zip, zipEntryName)
+    stats.countPages+=1
+    if WikidotHelpers.RedirectTarget(source) != None:
+        return []
+    refs=ReferenceExtractor.ExtractTargets(source)
+    stats.countRefs+=len(refs)
+    return refs
+
+
+def ScanPageStreamed(archive, zipEntryName, nameZip, stats):
+    return PageScanner.ScanPage(archive, zipEntryName, nameZip, stats).refs
+
+
+# *****************************************************************
+# Scan every page in the zip.  Returns (seconds, peak traced bytes, references found)
+def Measure(scan, zipFilepath):
+    stats=PageScanner.ScanStats()
+    with Archives.ZipArchive(zipFilepath) as archive:
+        names=[entry[0] for entry in archive.Entries()]
+        tracemalloc.start()
+        start=time.perf_counter()
+        for name in names:
+            scan(archive, name, name[7:-4], stats)
+        elapsed=time.perf_counter()-start
+        peak=tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak, stats.countRefs
+
+
+def Main(pageCount=8, pageSizeMB=4):
+    with tempfile.TemporaryDirectory() as workDir:
+        zipFilepath=os.path.join(workDir, "large-pages.zip")
+        WriteLargePages(zipFilepath, pageCount, int(pageSizeMB*1e6))
+        print("%d pages of about %.1f MB each" % (pageCount, pageSizeMB))
+        for label, scan in (("whole page", ScanPageWhole), ("streamed", ScanPageStreamed)):
+            elapsed, peak, refs=Measure(scan, zipFilepath)
+            print("%-11s %7.3fs   peak %7.1f MB   %d references" % (label, elapsed, peak/1e6, refs))
+
+
+if __name__ == "__main__":
+    Main(*[float(arg) if i == 1 else int(arg) for i, arg in enumerate(sys.argv[1:])])
@@ -0,0 +1,75 @@
+# Compare LinkGraph with the dict-of-lists/dict-of-dicts structures it replaced: build time and peak RSS
+# Run from the top of the repository:  python -m Benchmarks.BenchmarkLinkGraph [pages] [refsPerPage]
+# Each structure is built in a separate process so that the peak RSS figures don't contaminate each other.  (Linux: ru_maxrss is in KB.)
+
+import random
+import resource
+import subprocess
+import sys
+import time
+import LinkGraph
+
+
+# *****************************************************************
+# Yield (name, list of references) for a synthetic wiki.  About a third of the references are to pages which don't exist.
+def SyntheticPages(pageCount, refsPerPage, seed=1):
+    rng=random.Random(seed)
+    for i in range(pageCount):
+        refs=["page-%d" % int(rng.paretovariate(0.8)*pageCount/8 % (pageCount*1.5)) for j in range(rng.randint(0, 2*refsPerPage))]
+        yield "page-%d" % i, refs
+
+
+# *****************************************************************
+# The structures we used to build
+def BuildDicts(pages):
+    pagesRefs={}
+    pagesBacklinks={}
+    existingPages={}
+    for name, refs in pages:
+        existingPages[name]=True
+        for r in refs:
+            if pagesBacklinks.get(r) == None:
+                pagesBacklinks[r]={}
+            pagesBacklinks[r][name]=True
+        pagesRefs[name]=refs
+    missingPages={}
+    countRefs={}
+    for name in existingPages:
+        for r in pagesRefs[name]:
+            if existingPages.get(r) == None:
+                missingPages[r]=True
+            countRefs[r]=countRefs.get(r, 0)+1
+    return (pagesRefs, pagesBacklinks, existingPages, missingPages, countRefs)
+
+
+def BuildGraph(pages):
+    graph=LinkGraph.LinkGraph()
+    for name, refs in pages:
+        graph.AddPage(name, refs)
+    graph.Finish()
+    return graph
+
+
+# *****************************************************************
+# Build one of the structures and report (seconds, peak RSS growth in MB)
+def Measure(kind, pageCount, refsPerPage):
+    before=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start=time.perf_counter()
+    built=(BuildDicts if kind == "dicts" else BuildGraph)(SyntheticPages(pageCount, refsPerPage))
+    elapsed=time.perf_counter()-start
+    after=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return elapsed, (after-before)/1024
+
+
+def Main(pageCount=500000, refsPerPage=10):
+    for kind in ("dicts", "graph"):
+        out=subprocess.run([sys.executable, "-m", "Benchmarks.BenchmarkLinkGraph", "--measure", kind, str(pageCount), str(refsPerPage)], capture_output=True, text=True, check=True).stdout
+        elapsed, megabytes=out.split()
+        print("%-6s %7d pages  build %7.2fs  peak RSS growth %8.1f MB" % (kind, pageCount, float(elapsed), float(megabytes)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        print(*Measure(sys.argv[2], int(sys.argv[3]), int(sys.argv[4])))
+    else:
+        Main(*[int(a) for a in sys.argv[1:]])
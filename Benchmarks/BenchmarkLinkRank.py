@@ -0,0 +1,41 @@
+# Time the importance ranking (LinkRank) against the size of the link graph
+# Run from the top of the repository:  python -m Benchmarks.BenchmarkLinkRank [largest number of links]
+#
+# The graphs are random, shaped like a wiki's: every page has links, a fifth of the nodes are missing pages, and the targets follow a
+# power law so that a few pages get most of the links.  Each graph is ranked with scipy.sparse and with plain numpy.
+# "setup" is building the matrix (dropping self-links and duplicates); "iterating" is the power iteration itself.
+
+import sys
+import time
+import numpy
+import LinkRank
+
+
+# *****************************************************************
+# A random graph with about this many links.  Returns (sources, targets, teleport).
+def RandomGraph(links, linksPerPage=20, missingRatio=0.2, seed=1):
+    rng=numpy.random.default_rng(seed)
+    pages=max(1, links//linksPerPage)
+    nodes=int(pages/(1-missingRatio))
+    sources=rng.integers(0, pages, links)
+    targets=(rng.pareto(1.2, links)*nodes/50).astype(numpy.int64) % nodes
+    return sources, targets, numpy.ones(nodes)
+
+
+def Main(largest=2000000):
+    LinkRank.LoadSparse()       # (So that importing scipy isn't counted in the first timing)
+    print("%10s %10s  %-6s %8s %8s %6s %12s" % ("links", "nodes", "method", "setup", "iterating", "iters", "per iteration"))
+    links=10000
+    while links <= largest:
+        sources, targets, teleport=RandomGraph(links)
+        for useScipy in (True, False):
+            start=time.perf_counter()
+            importance=LinkRank.PageRank(sources, targets, teleport, useScipy=useScipy)
+            total=time.perf_counter()-start
+            print("%10d %10d  %-6s %7.3fs %7.3fs %6d %10.2fms" % (links, len(teleport), importance.method, total-importance.seconds, importance.seconds,
+                                                               importance.iterations, importance.seconds/importance.iterations*1000))
+        links*=10
+
+
+if __name__ == "__main__":
+    Main(*[int(arg) for arg in sys.argv[1:]])
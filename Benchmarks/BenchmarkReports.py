@@ -0,0 +1,42 @@
+# Check that writing "All Missing References" stays linear in the number of missing pages
+# Run from the top of the repository:  python -m Benchmarks.BenchmarkReports
+#
+# Every missing page in the synthetic wiki is reached only through a redirect, which is the case that used to be checked by scanning
+# the whole redirects dictionary once per missing page.
+
+import contextlib
+import os
+import time
+import LinkGraph
+import RedirectResolver
+import Reports
+import WantedPagesEnumerator
+
+
+# *****************************************************************
+# An AnalysisResult with missingCount missing pages, each referred to only through its own redirect
+def MakeResult(missingCount, pagesPerMissing=2):
+    redirects={"redirect-%d" % i: "missing-%d" % i for i in range(missingCount)}
+    result=WantedPagesEnumerator.AnalysisResult()
+    result.redirects, result.redirectReport=RedirectResolver.ResolveRedirects(redirects)
+    graph=LinkGraph.LinkGraph()
+    graph.AddRedirects(result.redirects)
+    for i in range(missingCount*pagesPerMissing):
+        graph.AddPage("page-%d" % i, ["redirect-%d" % (i % missingCount), "page-%d" % ((i+1) % (missingCount*pagesPerMissing))])
+    graph.Finish()
+    result.graph=graph
+    return result
+
+
+def Main(sizes=(10000, 20000, 40000, 80000, 160000)):
+    for missingCount in sizes:
+        result=MakeResult(missingCount)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):     # Don't time the console warnings
+            start=time.perf_counter()
+            Reports.WriteAllMissingReferences(result, os.devnull)
+            elapsed=time.perf_counter()-start
+        print("%8d missing pages  %7.3fs  %6.2f us per missing page" % (missingCount, elapsed, elapsed/missingCount*1e6))
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,114 @@
+# Time each phase of the enumerator's pipeline on synthetic backups of several sizes and save the results as JSON
+# Run from the top of the repository, e.g.:  python -m Benchmarks.RunBenchmarks --sizes 10000 100000 1000000
+#
+# The synthetic backups are kept in the work directory and reused by later runs with the same size and seed.
+# Compare two runs by diffing (or loading) their JSON files.
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import Archives
+import PageScanner
+import Reports
+import WantedPagesEnumerator
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+from Benchmarks import SyntheticBackup
+
+
+# *****************************************************************
+# Make (or reuse) the synthetic backup with this many pages
+def SyntheticBackupFilepath(workDir, pages, seed):
+    zipFilepath=os.path.join(workDir, "synthetic-%d-%d.zip" % (pages, seed))
+    if not os.path.exists(zipFilepath):
+        print("Writing", zipFilepath)
+        SyntheticBackup.WriteSyntheticBackup(zipFilepath+".part", SyntheticBackup.SyntheticWikiOptions(pages=pages, seed=seed))
+        os.replace(zipFilepath+".part", zipFilepath)
+    return zipFilepath
+
+
+# *****************************************************************
+# Run the pipeline one phase at a time.  Returns a dictionary of results for this backup.
+def BenchmarkBackup(zipFilepath, options):
+    WikidotHelpers.CannonicizeString.cache_clear()
+    WikidotHelpers.CannonicalAndRealNames.cache_clear()
+
+    phases={}
+    stats=PageScanner.ScanStats()
+    result=WantedPagesEnumerator.AnalysisResult()
+    result.archivePath=zipFilepath
+    archive=Archives.ZipArchive(zipFilepath)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), tempfile.TemporaryDirectory() as outputDir:    # Keep the log messages out of the timings
+        start=time.perf_counter()
+        entries=WantedPagesEnumerator.ListEntries(archive)
+        phases["list"]=time.perf_counter()-start
+
+        start=time.perf_counter()
+        records=WantedPagesEnumerator.ScanPages(archive, entries, options, stats)
+        phases["scan"]=time.perf_counter()-start
+
+        start=time.perf_counter()
+        contentPages=WantedPagesEnumerator.SortPages(result, records)
+        phases["classify"]=time.perf_counter()-start
+
+        start=time.perf_counter()
+        WantedPagesEnumerator.ResolveRedirectChains(result, contentPages)
+        phases["redirects"]=time.perf_counter()-start
+
+        start=time.perf_counter()
+        WantedPagesEnumerator.BuildGraph(result, contentPages)
+        phases["aggregation"]=time.perf_counter()-start
+
+        start=time.perf_counter()
+        WantedPagesEnumerator.RankImportance(result)
+        phases["importance"]=time.perf_counter()-start
+
+        start=time.perf_counter()
+        Reports.WriteReports(result, outputDir)
+        phases["reports"]=time.perf_counter()-start
+
+    return {"zipFilepath": zipFilepath,
+            "zipBytes": os.path.getsize(zipFilepath),
+            "pages": result.countPages,
+            "contentPages": result.countContentPages,
+            "redirects": result.countRedirects,
+            "references": result.countTotalRefs,
+            "phases": phases,
+            "total": sum(phases.values()),
+            # The scan's own breakdown.  These are summed over the worker processes, so with several workers they exceed the scan's wall-clock time.
+            "scanWork": {"bytesRead": stats.bytesRead, "readSeconds": stats.readSeconds, "extractionSeconds": stats.extractSeconds, "refsExtracted": stats.countRefs}}
+
+
+def Main(argv=None):
+    parser=argparse.ArgumentParser(description="Benchmark the enumerator's pipeline, phase by phase")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="the page counts of the synthetic backups")
+    parser.add_argument("--workers", type=int, default=None, help="the number of worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--work-dir", default="BenchmarkData", help="where the synthetic backups are kept")
+    parser.add_argument("--output", default=None, help="the JSON results file (default: benchmark-<date>-<time>.json in the work directory)")
+    args=parser.parse_args(argv)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    options=WantedPagesEnumerator.AnalysisOptions(workers=args.workers)
+    results=[]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        options.pool=pool
+        for pages in args.sizes:
+            results.append(BenchmarkBackup(SyntheticBackupFilepath(args.work_dir, pages, args.seed), options))
+            print("%9d pages: " % pages + "  ".join("%s %.3fs" % (phase, seconds) for phase, seconds in results[-1]["phases"].items()))
+
+    output=args.output
+    if output == None:
+        output=os.path.join(args.work_dir, time.strftime("benchmark-%Y-%m-%d-%H%M%S.json"))
+    with open(output, "w") as file:
+        json.dump({"date": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(), "platform": platform.platform(),
+                   "cpus": os.cpu_count(), "workers": args.workers, "results": results}, file, indent=2)
+    print("Results written to", output)
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,153 @@
+# Write realistic synthetic Wikidot backups for benchmarking
+#
+# The zip has the layout of a real Wikidot backup: one "source/<name>.txt" member per page, with pages in a category named
+# "source/<category>_<name>.txt".  <name> is the page's cannonicized name; the page sources refer to pages by display name.
+#
+# Run from the top of the repository, e.g.:  python -m Benchmarks.SyntheticBackup synthetic.zip --pages 100000
+
+import argparse
+import random
+import zipfile
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+
+
+# *****************************************************************
+# The knobs which shape a synthetic wiki
+class SyntheticWikiOptions:
+    def __init__(self, pages=10000, redirectRatio=0.15, maxChainDepth=3, linksPerPage=20, missingRatio=0.2, accentedRatio=0.05,
+                 categoryRatio=0.1, ignoredRatio=0.05, emptyRatio=0.01, wordsPerPage=300, seed=1):
+        self.pages=pages                    # Number of pages, including redirects and ignored pages
+        self.redirectRatio=redirectRatio    # Fraction of the pages which are redirects
+        self.maxChainDepth=maxChainDepth    # Redirects can point at other redirects, making chains up to this long
+        self.linksPerPage=linksPerPage      # Mean number of references on a content page
+        self.missingRatio=missingRatio      # Fraction of references which are to pages which don't exist
+        self.accentedRatio=accentedRatio    # Fraction of names which contain accented letters
+        self.categoryRatio=categoryRatio    # Fraction of pages which are in a category
+        self.ignoredRatio=ignoredRatio      # Fraction of pages with prefixes which the enumerator ignores (nav_, forum_, conbar1...)
+        self.emptyRatio=emptyRatio          # Fraction of content pages which are empty
+        self.wordsPerPage=wordsPerPage      # Mean number of words of filler text on a content page
+        self.seed=seed
+
+
+firstNames=["John", "Jane", "Bob", "Alice", "Forrest", "Harry", "Ted", "Lee", "Noreen", "Walt", "Bjo", "Arthur", "Rusty", "Milt"]
+lastNames=["Smith", "Doe", "Tucker", "Warner", "White", "Ackerman", "Hevelin", "Carr", "Willis", "Shaw", "Trimble", "Rothman"]
+accentedNames=["Émile", "Zoë", "Ólafur", "Kröger", "Hélène", "Íñigo", "Łukasz", "Ångström", "Bjørn", "Dvořák", "Straße"]
+things=["Worldcon", "Con", "Fanzine", "Award", "Club", "Society", "APA", "Press", "Bid", "Convention", "Newsletter"]
+categories=["fan", "con", "pro", "fanzine", "club"]
+ignoredPrefixes=["nav_", "deleted_", "forum_", "system_", "admin_", "search_", "index_", "testing_", "conbar1", "fanbar1"]
+fillerWords=["the", "of", "and", "fandom", "was", "in", "a", "fanzine", "con", "he", "she", "published", "attended", "1984", "with"]
+
+
+# *****************************************************************
+# Make up a display name for page i
+def DisplayName(rng, i, options):
+    if rng.random() < options.accentedRatio:
+        first=rng.choice(accentedNames)
+    else:
+        first=rng.choice(firstNames)
+    kind=rng.random()
+    if kind < 0.5:
+        return first+" "+rng.choice(lastNames)+" "+str(i)
+    if kind < 0.8:
+        return rng.choice(lastNames)+" "+rng.choice(things)+" "+str(i)
+    return str(1930+i % 95) if i < 95 else first+" "+rng.choice(things)+" "+str(i)
+
+
+# *****************************************************************
+# Write the synthetic backup to zipFilepath
+# Returns a dictionary of counts describing what was written
+def WriteSyntheticBackup(zipFilepath, options):
+    rng=random.Random(options.seed)
+
+    # Decide what each page is
+    names=[]            # Display names, by page number
+    zipNames=[]         # The zip entry name of each page
+    kinds=[]            # "content", "redirect", "empty" or "ignored"
+    for i in range(options.pages):
+        name=DisplayName(rng, i, options)
+        category=None
+        if rng.random() < options.categoryRatio:
+            category=rng.choice(categories)
+            name=category+":"+name
+        cannonical=WikidotHelpers.CannonicizeZipName(name).replace(":", "_")
+        r=rng.random()
+        if r < options.ignoredRatio:
+            kind="ignored"
+            cannonical=rng.choice(ignoredPrefixes)+cannonical.replace("_", "-")
+        elif r < options.ignoredRatio+options.redirectRatio:
+            kind="redirect"
+        elif r < options.ignoredRatio+options.redirectRatio+options.emptyRatio:
+            kind="empty"
+        else:
+            kind="content"
+        names.append(name)
+        zipNames.append("source/"+cannonical+".txt")
+        kinds.append(kind)
+
+    linkable=[i for i in range(options.pages) if kinds[i] != "ignored"]
+    nonRedirects=[i for i in linkable if kinds[i] != "redirect"]
+    depth={}    # The length of the redirect chain starting at each redirect
+
+    # A few pages are very popular.  Pick link targets from a Zipf-like distribution over a shuffled list of pages.
+    popularity=list(linkable)
+    rng.shuffle(popularity)
+
+    def LinkTarget():
+        if rng.random() < options.missingRatio:
+            return "Missing Page " + str(int(rng.paretovariate(1.0)*10) % (options.pages//4+1))
+        return names[popularity[min(int(rng.paretovariate(1.1))-1, len(popularity)-1)]]
+
+    counts={"content": 0, "redirect": 0, "empty": 0, "ignored": 0, "links": 0}
+    with zipfile.ZipFile(zipFilepath, "w", compression=zipfile.ZIP_DEFLATED) as zip:
+        for i in range(options.pages):
+            kind=kinds[i]
+            counts[kind]+=1
+            if kind == "redirect":
+                # Point at another redirect (making a chain) or at a real page
+                target=rng.choice(nonRedirects) if len(nonRedirects) > 0 else i
+                if i > 0 and rng.random() < 0.3:
+                    previous=rng.randrange(i)
+                    if kinds[previous] == "redirect" and depth.get(previous, 1) < options.maxChainDepth:
+                        target=previous
+                depth[i]=depth.get(target, 0)+1
+                zip.writestr(zipNames[i], '[[module Redirect destination="' + names[target] + '"]]')
+                continue
+            if kind == "empty":
+                zip.writestr(zipNames[i], "")
+                continue
+
+            out=["+ " + names[i], ""]
+            linkCount=rng.randint(0, 2*options.linksPerPage)
+            counts["links"]+=linkCount
+            words=rng.randint(options.wordsPerPage//2, options.wordsPerPage*3//2)
+            wordsPerLink=words//(linkCount+1)+1
+            for j in range(linkCount):
+                out.append(" ".join(rng.choice(fillerWords) for k in range(wordsPerLink)))
+                target=LinkTarget()
+                form=rng.random()
+                if form < 0.15:
+                    out.append("[[[" + target + "|" + target.split(":")[-1] + "]]]")
+                elif form < 0.2:
+                    out.append("[[[*http://www.example.com/" + str(j) + "|an external link]]]")
+                elif form < 0.22:
+                    out.append("[[[[" + target + "]]]]")
+                else:
+                    out.append("[[[" + target + "]]]")
+            zip.writestr(zipNames[i], " ".join(out))
+    return counts
+
+
+# *****************************************************************
+def Main(argv=None):
+    parser=argparse.ArgumentParser(description="Write a synthetic Wikidot backup")
+    parser.add_argument("zipFilepath")
+    defaults=SyntheticWikiOptions()
+    for name, value in vars(defaults).items():
+        parser.add_argument("--"+name, type=type(value), default=value)
+    args=vars(parser.parse_args(argv))
+    zipFilepath=args.pop("zipFilepath")
+    print(WriteSyntheticBackup(zipFilepath, SyntheticWikiOptions(**args)))
+
+
+if __name__ == "__main__":
+    Main()
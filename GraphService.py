@@ -0,0 +1,165 @@
+# A small local HTTP/JSON service which answers questions about a wiki from a graph snapshot (see GraphSnapshot)
+# Start it with:  python GraphService.py "2019-09-22 Graph Snapshot.sqlite" [--port 8765]
+# It listens on localhost only.  Every query is a GET which takes the page name (raw or cannonicized) as ?page=, e.g.:
+#   /backlinks?page=Worldcon        the pages which link to the page as written, and the redirects which lead to it
+#   /links?page=Worldcon            the page's references, as written and after following redirects
+#   /resolve?page=Worldcon          where the page ends up after following redirects
+#   /wanted?page=Worldcon           the page's reference count and, if it is missing, its rank among the missing pages
+#   /wanted?top=50                  the most referenced missing pages
+#   /name?page=worldcon             the page's display name
+#   /info                           what the snapshot is of
+
+import argparse
+import json
+import pathlib
+import sqlite3
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import GraphSnapshot
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+
+
+# *****************************************************************
+# The queries, answered straight from the snapshot's indexes.  Each thread gets its own read-only connection.
+class GraphQueries:
+    def __init__(self, filepath):
+        self.filepath=filepath
+        self.local=threading.local()
+        meta=dict(self.Db().execute("SELECT key, value FROM meta"))
+        if meta.get("version") != str(GraphSnapshot.snapshotVersion):
+            raise ValueError("'" + filepath + "' is a graph snapshot from a different version (" + str(meta.get("version")) + ")")
+        self.meta=meta
+
+    def Db(self):
+        db=getattr(self.local, "db", None)
+        if db == None:
+            db=self.local.db=sqlite3.connect(pathlib.Path(self.filepath).resolve().as_uri() + "?mode=ro", uri=True)
+        return db
+
+    def One(self, sql, parameters):
+        row=self.Db().execute(sql, parameters).fetchone()
+        if row == None:
+            return None
+        return row[0]
+
+    def Column(self, sql, parameters):
+        return [row[0] for row in self.Db().execute(sql, parameters)]
+
+    # *****************************************************************
+    def Resolve(self, name):
+        resolved=self.One("SELECT resolved FROM redirects WHERE name=?", (name,))
+        if resolved == None:
+            return name
+        return resolved
+
+    def DisplayName(self, name):
+        real=self.One("SELECT real FROM names WHERE cannonical=?", (name,))
+        if real != None:
+            return real
+        return name.replace("-", "")    # The same fallback as WikidotHelpers.UncannonicizeZipName
+
+    def Backlinks(self, name):
+        return {"page": name,
+                "backlinks": self.Column("SELECT source FROM links WHERE target=? ORDER BY source", (name,)),
+                "redirectsHere": self.Column("SELECT name FROM redirects WHERE resolved=? ORDER BY name", (name,))}
+
+    def Links(self, name):
+        links=[]
+        for refs in self.Column("SELECT refs FROM pages WHERE name=? AND redirect IS NULL", (name,)):
+            if refs != None:
+                links.extend({"target": target, "resolved": self.Resolve(target)} for target in json.loads(refs))
+        return {"page": name, "exists": self.Exists(name), "links": links}
+
+    def Exists(self, name):
+        return self.One("SELECT 1 FROM pages WHERE name=? AND redirect IS NULL", (name,)) != None and self.One("SELECT 1 FROM redirects WHERE name=?", (name,)) == None
+
+    def ResolveQuery(self, name):
+        return {"page": name, "redirect": self.One("SELECT target FROM redirects WHERE name=?", (name,)), "resolved": self.Resolve(name)}
+
+    def Wanted(self, name):
+        resolved=self.Resolve(name)
+        row=self.Db().execute("SELECT count, missing, rank FROM refcounts WHERE name=?", (resolved,)).fetchone()
+        if row == None:
+            row=(0, 0, None)
+        return {"page": name, "resolved": resolved, "count": row[0], "missing": row[1] == 1, "rank": row[2]}
+
+    def TopWanted(self, top):
+        rows=self.Db().execute("SELECT name, count, rank FROM refcounts WHERE missing=1 ORDER BY rank, name LIMIT ?", (top,))
+        return {"wanted": [{"page": name, "display": self.DisplayName(name), "count": count, "rank": rank} for name, count, rank in rows]}
+
+    def Name(self, name):
+        return {"page": name, "display": self.DisplayName(name)}
+
+    # *****************************************************************
+    # Answer a query: path is e.g. "/backlinks" and parameters is a dictionary of the query parameters
+    # Returns (HTTP status, a dictionary to send back as JSON)
+    def Answer(self, path, parameters):
+        if path == "/info":
+            return 200, {"label": self.meta.get("label"), "saved": self.meta.get("saved"), "version": self.meta.get("version")}
+        if path == "/wanted" and "top" in parameters:
+            try:
+                return 200, self.TopWanted(int(parameters["top"]))
+            except ValueError:
+                return 400, {"error": "top must be a number"}
+
+        queries={"/backlinks": self.Backlinks, "/links": self.Links, "/resolve": self.ResolveQuery, "/wanted": self.Wanted, "/name": self.Name}
+        query=queries.get(path)
+        if query == None:
+            return 404, {"error": "unknown query '" + path + "'", "queries": sorted(queries)+["/info"]}
+        page=parameters.get("page")
+        if page == None or len(page.strip()) == 0:
+            return 400, {"error": "a page is needed: " + path + "?page=<name>"}
+        return 200, query(WikidotHelpers.CannonicalAndRealNames(page)[0])
+
+
+# *****************************************************************
+class QueryHandler(BaseHTTPRequestHandler):
+    queries=None        # The GraphQueries, set by MakeServer()
+
+    def do_GET(self):
+        url=urlsplit(self.path)
+        parameters={key: values[-1] for key, values in parse_qs(url.query).items()}
+        status, answer=self.queries.Answer(url.path.rstrip("/") or "/", parameters)
+        body=json.dumps(answer, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):    # Keep the console quiet
+        pass
+
+
+# *****************************************************************
+# Make the server (listening on localhost only).  Port 0 picks a free port; the one chosen is server.server_address[1].
+def MakeServer(snapshotFilepath, port=8765):
+    handler=type("SnapshotQueryHandler", (QueryHandler,), {"queries": GraphQueries(snapshotFilepath)})
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+def Main(argv=None):
+    parser=argparse.ArgumentParser(description="Answer link graph queries about a wiki from a graph snapshot, over HTTP on localhost")
+    parser.add_argument("snapshot", help="a graph snapshot written by WantedPagesEnumerator.py --save-snapshot")
+    parser.add_argument("--port", type=int, default=8765)
+    args=parser.parse_args(argv)
+
+    try:
+        server=MakeServer(args.snapshot, args.port)
+    except (ValueError, sqlite3.DatabaseError) as e:
+        print("ERROR: " + str(e))
+        return 1
+    print("Serving " + args.snapshot + " on http://127.0.0.1:" + str(server.server_address[1]) + "/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
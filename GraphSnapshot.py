@@ -0,0 +1,132 @@
+# Saving a WikiState to disk, so that a later backup can be compared with it without the earlier backup having to be scanned again
+#
+# A snapshot is a SQLite database holding each zip entry's CRC, size and cannonicized page, plus the display names
+# which the reports use to print the pages' names.
+#
+# It also holds the link graph in indexed form, so that GraphService can answer questions about it without the backup being read again:
+#   pages       (indexed by name as well, for the forward links)
+#   links       (source, target) for each distinct link from a content page, target as written
+#   redirects   (name, target as written, resolved target)
+#   refcounts   (name, reference count after following redirects, whether the page is missing, rank among the missing pages by count)
+# The rank is 1 for the most referenced missing page(s); pages with equal counts share a rank.
+
+import json
+import os
+import pathlib
+import sqlite3
+import time
+import BackupDiff
+
+# Bump this whenever the layout, or the way pages are named, changes.  A snapshot written by a different version can't be loaded.
+snapshotVersion=3
+
+
+# Raised by LoadSnapshot when a file isn't a snapshot this version can read
+class SnapshotError(ValueError):
+    pass
+
+
+# *****************************************************************
+# Write the state and the display names (from a NameRegistry) to filepath, replacing anything already there
+def SaveSnapshot(state, filepath, names):
+    db=sqlite3.connect(filepath)
+    try:
+        for table in ("meta", "pages", "names", "links", "redirects", "refcounts"):
+            db.execute("DROP TABLE IF EXISTS "+table)
+        db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute("CREATE TABLE pages (entry TEXT PRIMARY KEY, crc INTEGER, size INTEGER, name TEXT, redirect TEXT, refs TEXT)")
+        db.execute("CREATE TABLE names (cannonical TEXT PRIMARY KEY, real TEXT)")
+        db.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                       [("version", str(snapshotVersion)), ("label", state.label), ("saved", time.strftime("%Y-%m-%d %H:%M:%S"))])
+
+        # The pages go in in zip order, which is the order they come back out in
+        rows=[]
+        for zipEntryName, page in state.pages.items():
+            refs=None
+            if page[2] != None:
+                refs=json.dumps(page[2], ensure_ascii=False)
+            crc, size=state.entries[zipEntryName]
+            rows.append((zipEntryName, crc, size, page[0], page[1], refs))
+        db.executemany("INSERT INTO pages (entry, crc, size, name, redirect, refs) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        db.executemany("INSERT INTO names (cannonical, real) VALUES (?, ?)", names.Items())
+        SaveGraph(state, db)
+        db.commit()
+    finally:
+        db.close()
+
+
+# *****************************************************************
+# Write the indexed tables of the link graph.  (The indexes are built after the rows go in, which is much faster.)
+def SaveGraph(state, db):
+    db.execute("CREATE TABLE links (source TEXT, target TEXT)")
+    db.execute("CREATE TABLE redirects (name TEXT PRIMARY KEY, target TEXT, resolved TEXT)")
+    db.execute("CREATE TABLE refcounts (name TEXT PRIMARY KEY, count INTEGER, missing INTEGER, rank INTEGER)")
+
+    links=[]
+    for page in state.pages.values():
+        refs=BackupDiff.Contribution(page, state.redirects)
+        links.extend((page[0], target) for target in dict.fromkeys(refs))
+    db.executemany("INSERT INTO links (source, target) VALUES (?, ?)", links)
+    db.executemany("INSERT INTO redirects (name, target, resolved) VALUES (?, ?, ?)", [(name, target, state.Resolve(name)) for name, target in state.redirects.items()])
+
+    counts={}
+    for name, count in state.rawCounts.items():
+        resolved=state.Resolve(name)
+        counts[resolved]=counts.get(resolved, 0)+count
+    rows=[]
+    countMissing=0
+    rank=0
+    previousCount=None
+    for name, count in sorted(counts.items(), key=lambda x: (-x[1], x[0])):
+        if state.Exists(name):
+            rows.append((name, count, 0, None))
+            continue
+        countMissing+=1
+        if count != previousCount:
+            rank=countMissing
+            previousCount=count
+        rows.append((name, count, 1, rank))
+    db.executemany("INSERT INTO refcounts (name, count, missing, rank) VALUES (?, ?, ?, ?)", rows)
+
+    db.execute("CREATE INDEX pagesByName ON pages (name)")
+    db.execute("CREATE INDEX linksByTarget ON links (target)")
+    db.execute("CREATE INDEX linksBySource ON links (source)")
+    db.execute("CREATE INDEX redirectsByResolved ON redirects (resolved)")
+    db.execute("CREATE INDEX refcountsByRank ON refcounts (rank)")
+
+
+# *****************************************************************
+# Read a snapshot back in.  If names (a NameRegistry) is given, the snapshot's display names are noted in it, and so are the names of
+# any pages the state is later updated with.
+# Returns a WikiState.  Raises SnapshotError if there's no such file, or if it isn't a snapshot this version can read.
+# The file is opened read-only, so that a mistyped name doesn't leave an empty database behind.
+def LoadSnapshot(filepath, names=None):
+    if not os.path.isfile(filepath):
+        raise SnapshotError("'" + filepath + "': no such file")
+    db=sqlite3.connect(pathlib.Path(filepath).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        try:
+            meta=dict(db.execute("SELECT key, value FROM meta"))
+        except sqlite3.DatabaseError:
+            raise SnapshotError("'" + filepath + "' is not a graph snapshot")
+        if meta.get("version") != str(snapshotVersion):
+            raise SnapshotError("'" + filepath + "' is a graph snapshot from a different version (" + str(meta.get("version")) + ")")
+
+        entries={}
+        pages={}
+        for zipEntryName, crc, size, name, redirect, refs in db.execute("SELECT entry, crc, size, name, redirect, refs FROM pages ORDER BY rowid"):
+            entries[zipEntryName]=(crc, size)
+            if refs != None:
+                refs=tuple(json.loads(refs))
+            pages[zipEntryName]=(name, redirect, refs)
+        if names != None:
+            for cannonical, real in db.execute("SELECT cannonical, real FROM names"):
+                names.AddWritten(real, cannonical)
+    finally:
+        db.close()
+
+    state=BackupDiff.WikiState()
+    state.label=meta.get("label")
+    state.names=names
+    state.SetPages(entries, pages)
+    return state
@@ -0,0 +1,199 @@
+# A compact store for the wiki's link graph
+#
+# Each cannonicized name is interned once and from then on is just an integer ID.
+# The links are kept in CSR (compressed sparse row) form in array('i') buffers: for row r, the targets are targets[offsets[r]:offsets[r+1]].
+# Existence flags are bitsets and reference counts are an array of ints, all indexed by ID.
+#
+# Forward links are kept exactly as written on the page (i.e., not yet redirected); redirects are applied through the resolved array.
+# Backlinks are indexed by the target as written, so a page which links to a redirect is a backlink of the redirect.
+
+from array import array
+
+
+# *****************************************************************
+# A set of small non-negative integers, one bit each
+class Bitset:
+    def __init__(self, size=0):
+        self.bits=bytearray((size+7)//8)
+
+    def Grow(self, size):
+        if len(self.bits) < (size+7)//8:
+            self.bits.extend(bytes((size+7)//8-len(self.bits)))
+
+    def Set(self, i):
+        self.Grow(i+1)
+        self.bits[i>>3]|=1<<(i&7)
+
+    def Get(self, i):
+        if i>>3 >= len(self.bits):
+            return False
+        return self.bits[i>>3]&(1<<(i&7)) != 0
+
+    def Count(self):
+        return sum(bin(b).count("1") for b in self.bits)
+
+
+# *****************************************************************
+class LinkGraph:
+    def __init__(self):
+        self.names=[]               # ID -> cannonicized name
+        self.ids={}                 # Cannonicized name -> ID
+
+        # What we're told while the graph is being built
+        self.existing=Bitset()      # The content pages
+        self.existingIds=array('i') # The content pages in the order they were added
+        self.redirects=array('i')   # Pairs of (redirect ID, ID of the redirect's final destination)
+        self.pageIds=array('i')     # Row -> ID of the page whose references are in that row
+        self.offsets=array('i', [0])    # The forward CSR offsets, by row
+        self.targets=array('i')         # The forward CSR targets, as written on the page
+
+        # What Finish() works out
+        self.resolved=None          # ID -> ID after following redirects
+        self.rows=None              # ID -> row in the forward CSR, or -1 if the page has no row
+        self.counts=None            # ID -> number of references to it (after following redirects)
+        self.referencedIds=None     # The IDs of all referenced pages (after following redirects), in order of first reference
+        self.missing=None           # Bitset of referenced pages (after following redirects) which do not exist
+        self.missingIds=None        # The missing pages in order of first reference
+        self.backOffsets=None       # The backlink CSR offsets, by ID
+        self.backSources=None       # The backlink CSR sources: the IDs of the pages which link to each target
+
+    # *****************************************************************
+    # Building the graph
+
+    # Get the ID for a name, assigning a new one if necessary
+    def Intern(self, name):
+        id=self.ids.get(name)
+        if id == None:
+            id=len(self.names)
+            self.ids[name]=id
+            self.names.append(name)
+        return id
+
+    # Add a content page.  refs is the list of cannonicized references on the page, or None if the page is empty.
+    def AddPage(self, name, refs):
+        id=self.Intern(name)
+        if not self.existing.Get(id):
+            self.existing.Set(id)
+            self.existingIds.append(id)
+        if refs == None:
+            return
+        self.pageIds.append(id)
+        self.targets.extend(self.Intern(ref) for ref in refs)
+        self.offsets.append(len(self.targets))
+
+    # Add the (fully resolved) redirects dictionary
+    def AddRedirects(self, redirects):
+        for name, target in redirects.items():
+            self.redirects.append(self.Intern(name))
+            self.redirects.append(self.Intern(target))
+
+    # Build the derived arrays.  This must be called once all the pages and redirects have been added.
+    def Finish(self):
+        n=len(self.names)
+        self.existing.Grow(n)
+
+        self.resolved=array('i', range(n))
+        for i in range(0, len(self.redirects), 2):
+            self.resolved[self.redirects[i]]=self.redirects[i+1]
+
+        self.rows=array('i', [-1])*n
+        for row, id in enumerate(self.pageIds):
+            self.rows[id]=row
+
+        # Reference counts and missing pages are by resolved target
+        self.counts=array('i', [0])*n
+        self.referencedIds=array('i')
+        self.missing=Bitset(n)
+        self.missingIds=array('i')
+        resolved=self.resolved
+        counts=self.counts
+        for t in self.targets:
+            r=resolved[t]
+            if counts[r] == 0:
+                self.referencedIds.append(r)
+                if not self.existing.Get(r):
+                    self.missing.Set(r)
+                    self.missingIds.append(r)
+            counts[r]+=1
+
+        # Backlinks are by target as written.  A page which links to the same target more than once is only listed once.
+        lastRow=array('i', [-1])*n
+        degree=array('i', [0])*(n+1)
+        for row in range(len(self.pageIds)):
+            for t in self.targets[self.offsets[row]:self.offsets[row+1]]:
+                if lastRow[t] != row:
+                    lastRow[t]=row
+                    degree[t+1]+=1
+        for i in range(n):
+            degree[i+1]+=degree[i]
+        self.backOffsets=degree
+        self.backSources=array('i', [0])*degree[n]
+        fill=array('i', degree[:n])
+        lastRow=array('i', [-1])*n
+        for row, id in enumerate(self.pageIds):
+            for t in self.targets[self.offsets[row]:self.offsets[row+1]]:
+                if lastRow[t] != row:
+                    lastRow[t]=row
+                    self.backSources[fill[t]]=id
+                    fill[t]+=1
+
+    # *****************************************************************
+    # Looking things up
+
+    # The ID of a name, or None if the name is not in the graph
+    def Id(self, name):
+        return self.ids.get(name)
+
+    def Name(self, id):
+        return self.names[id]
+
+    def CountNames(self):
+        return len(self.names)
+
+    def CountRefs(self):
+        return len(self.targets)
+
+    def Exists(self, id):
+        return self.existing.Get(id)
+
+    def IsMissing(self, id):
+        return self.missing.Get(id)
+
+    def HasRefs(self, id):
+        return self.rows[id] >= 0
+
+    # The references on a page, after following redirects
+    def Refs(self, id):
+        row=self.rows[id]
+        if row < 0:
+            return []
+        return [self.resolved[t] for t in self.targets[self.offsets[row]:self.offsets[row+1]]]
+
+    # The number of references to a page, after following redirects
+    def RefCount(self, id):
+        return self.counts[id]
+
+    # The pages which link to this name as written
+    def Backlinks(self, id):
+        return self.backSources[self.backOffsets[id]:self.backOffsets[id+1]]
+
+    def BacklinkCount(self, id):
+        return self.backOffsets[id+1]-self.backOffsets[id]
+
+    # The number of distinct names which are linked to (as written)
+    def CountBacklinkedNames(self):
+        return sum(1 for i in range(len(self.names)) if self.backOffsets[i+1] > self.backOffsets[i])
+
+    def ExistingIds(self):
+        return self.existingIds
+
+    def MissingIds(self):
+        return self.missingIds
+
+    def ReferencedIds(self):
+        return self.referencedIds
+
+    # The arrays behind the forward links, for code which works on the whole graph at once (see LinkRank):
+    # (row -> page ID, the row offsets, the targets as written, ID -> ID after following redirects)
+    def ForwardArrays(self):
+        return self.pageIds, self.offsets, self.targets, self.resolved
@@ -0,0 +1,110 @@
+# Ranking pages by importance rather than by raw reference count
+#
+# A missing page linked from a few heavily linked articles matters more than one linked from dozens of year pages and lists, and a raw
+# reference count can't tell the two apart.  A page's importance is its PageRank on the resolved link graph (i.e., after following redirects):
+# a reader on a page follows one of its links with probability damping and otherwise jumps to a page chosen at random.
+# Missing pages and pages without links are dead ends, from which the reader jumps at random.
+# A page which links to another more than once counts once, and links from a page to itself are ignored.
+#
+# The power iteration is done with sparse matrix-vector products over numpy arrays: scipy.sparse if it is installed, numpy.bincount() if not.
+# numpy and scipy are only imported here, and only when a ranking is wanted, so the rest of the program runs without them.
+# Without numpy there is no ranking.
+
+import time
+
+
+# *****************************************************************
+# The outcome of a ranking
+class Importance:
+    def __init__(self, scores, iterations, delta, seconds, method):
+        self.scores=scores          # A numpy array of the pages' importance, by LinkGraph ID.  Scaled so that the average page scores 1.
+        self.iterations=iterations  # The number of power iterations done
+        self.delta=delta            # How much the ranks changed (L1) in the last iteration
+        self.seconds=seconds        # Time spent iterating (not counting building the matrix)
+        self.method=method          # "scipy" or "numpy"
+
+    def Score(self, id):
+        return float(self.scores[id])
+
+
+# *****************************************************************
+# Import numpy, or return None if it isn't installed
+def LoadNumpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def LoadSparse():
+    try:
+        import scipy.sparse
+    except ImportError:
+        return None
+    return scipy.sparse
+
+
+# *****************************************************************
+# Rank the pages of a LinkGraph (which must be finished).  Returns an Importance, or None if numpy isn't installed.
+def RankImportance(graph, damping=0.85, tolerance=1e-9, maxIterations=200, useScipy=True):
+    numpy=LoadNumpy()
+    if numpy == None:
+        return None
+    pageIds, offsets, targets, resolved=graph.ForwardArrays()
+    pageIds=numpy.asarray(pageIds, dtype=numpy.int64)
+    resolved=numpy.asarray(resolved, dtype=numpy.int64)
+    sources=numpy.repeat(pageIds, numpy.diff(numpy.asarray(offsets, dtype=numpy.int64)))
+    targets=resolved[numpy.asarray(targets, dtype=numpy.int64)]
+
+    # A redirect's own name is not a page: the reader can't jump to it, and no link (once resolved) leads to it
+    pages=resolved == numpy.arange(len(resolved))
+    return PageRank(sources, targets, pages.astype(numpy.float64), damping, tolerance, maxIterations, useScipy)
+
+
+# *****************************************************************
+# The power iteration itself, over the links sources[i] -> targets[i] between nodes 0..len(teleport)-1
+# teleport gives each node's weight in a random jump (zero for nodes which aren't pages).
+def PageRank(sources, targets, teleport, damping=0.85, tolerance=1e-9, maxIterations=200, useScipy=True):
+    numpy=LoadNumpy()
+    sparse=LoadSparse() if useScipy else None
+    n=len(teleport)
+    pageCount=teleport.sum()
+    if pageCount == 0:
+        return Importance(numpy.zeros(n), 0, 0.0, 0.0, "numpy")
+    teleport=teleport/pageCount
+
+    # Drop self-links and count each (source, target) pair once
+    keep=sources != targets
+    pairs=numpy.unique(sources[keep]*n+targets[keep])
+    sources=pairs//n
+    targets=pairs%n
+    outDegree=numpy.bincount(sources, minlength=n)
+    deadEnd=outDegree == 0
+    share=numpy.zeros(n)
+    share[~deadEnd]=1.0/outDegree[~deadEnd]     # The fraction of a page's rank which goes down each of its links
+
+    if sparse != None:
+        inbound=sparse.csr_matrix((numpy.ones(len(sources)), (targets, sources)), shape=(n, n))     # Row t holds the pages which link to t
+        def Follow(x):
+            return inbound @ x
+        method="scipy"
+    else:
+        def Follow(x):
+            return numpy.bincount(targets, weights=x[sources], minlength=n)
+        method="numpy"
+
+    start=time.perf_counter()
+    rank=teleport.copy()
+    delta=0.0
+    iterations=0
+    while iterations < maxIterations:
+        iterations+=1
+        stranded=rank[deadEnd].sum()
+        following=damping*Follow(rank*share)
+        following+=(damping*stranded+1.0-damping)*teleport
+        delta=float(numpy.abs(following-rank).sum())
+        rank=following
+        if delta < tolerance:
+            break
+    return Importance(rank*pageCount, iterations, delta, time.perf_counter()-start, method)
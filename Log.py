@@ -0,0 +1,30 @@
+# The run's log: every message goes both to the console and to the log file (if one is open)
+
+log=None
+
+
+# *****************************************************************
+# Start logging to a file, closing any earlier log file
+def OpenLog(filepath):
+    global log
+    CloseLog()
+    log=open(filepath, "w", encoding="utf-8")
+
+
+def CloseLog():
+    global log
+    if log != None:
+        log.close()
+        log=None
+
+
+def logger(message):
+    if log != None:
+        print(message, file=log)
+    print(message)
+
+
+# Write a batch of lines to the log file only
+def LogToFile(lines):
+    if log != None and len(lines) > 0:
+        log.write("\n".join(lines)+"\n")
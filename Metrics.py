@@ -0,0 +1,114 @@
+# Instrumentation for a run: phase timers, counters, peak memory, an optional profile, and the run's warnings
+#
+# Warnings are not logged as they happen.  They are collected as structured records and written out in one batch at the end of the run
+# (in full to the log file, as counts by kind to the console), and are also included in the run's metrics JSON.
+
+import contextlib
+import cProfile
+import json
+import time
+import tracemalloc
+from Log import logger, LogToFile
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+
+# The text for each kind of warning.  {page} is the page concerned; {detail} is any extra information.
+warningMessages={
+    "empty-page": "Warning: Page '{page}' is empty.",
+    "circular-redirect": "Warning: '{page}' is a circular redirect reference",
+    "redirect-loop": "ERROR: redirect loop: {detail}",
+    "dangling-redirect": "Warning: '{page}' redirects to '{detail}', which does not exist",
+    "no-references": "Warning: '{page}' is an existing page, but has no references",
+    "unused-redirect-only": "Warning: '{page}' does not exist and is referred to only by an unused redirect",
+    "no-backlinks": "Warning: '{page}' is in missingPages but is not in pagesBacklinks",
+    "unicode": "ERROR: '{page}' has a referring page which caused a UnicodeEncodeError",
+    "cache-mismatch": "ERROR: cached scan of '{page}' differs from a full scan",
+}
+
+
+# *****************************************************************
+class RunMetrics:
+    def __init__(self, traceMemory=False, profile=False):
+        self.phases={}          # Phase name -> {"wallSeconds", "cpuSeconds", and, if memory is traced, "peakBytes"}
+        self.counters={}        # Counter name -> value
+        self.warnings=[]        # The warnings, each a dictionary with "kind", "page" and "detail"
+        self.traceMemory=traceMemory
+        self.profiler=cProfile.Profile() if profile else None
+        self.start=None
+        self.cannonicizeCacheInfo=None      # The cannonicization caches' statistics at Start() (they're process-wide, and run on from one archive to the next)
+
+    # *****************************************************************
+    # The run as a whole
+    def Start(self):
+        self.start=(time.perf_counter(), time.process_time())
+        self.cannonicizeCacheInfo=WikidotHelpers.CannonicizeCacheInfo()
+        if self.traceMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profiler != None:
+            self.profiler.enable()
+
+    def Stop(self):
+        if self.profiler != None:
+            self.profiler.disable()
+        if self.start != None:
+            self.phases["total"]={"wallSeconds": time.perf_counter()-self.start[0], "cpuSeconds": time.process_time()-self.start[1]}
+            if self.traceMemory and tracemalloc.is_tracing():
+                self.phases["total"]["peakBytes"]=tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+    # Count this run's hits and misses in the cannonicization caches (as "CannonicizeStringHits", etc.)
+    def CountCannonicizeCaches(self):
+        atStart=self.cannonicizeCacheInfo or {}
+        for name, info in WikidotHelpers.CannonicizeCacheInfo().items():
+            hits, misses=(atStart[name].hits, atStart[name].misses) if name in atStart else (0, 0)
+            self.counters[name+"Hits"]=info.hits-hits
+            self.counters[name+"Misses"]=info.misses-misses
+
+    # Time a phase:   with metrics.Phase("scan"): ...
+    # CPU time is for this process only.  (The scan's worker processes report their own time through the counters.)
+    @contextlib.contextmanager
+    def Phase(self, name):
+        if self.traceMemory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        wall=time.perf_counter()
+        cpu=time.process_time()
+        try:
+            yield
+        finally:
+            phase={"wallSeconds": time.perf_counter()-wall, "cpuSeconds": time.process_time()-cpu}
+            if self.traceMemory and tracemalloc.is_tracing():
+                phase["peakBytes"]=tracemalloc.get_traced_memory()[1]
+            self.phases[name]=phase
+
+    # *****************************************************************
+    # Counters and warnings
+    def Count(self, name, n=1):
+        self.counters[name]=self.counters.get(name, 0)+n
+
+    def Warn(self, kind, page, detail=None):
+        self.warnings.append({"kind": kind, "page": page, "detail": detail})
+
+    def WarningCounts(self):
+        counts={}
+        for warning in self.warnings:
+            counts[warning["kind"]]=counts.get(warning["kind"], 0)+1
+        return counts
+
+    # Write all the warnings to the log file and a count of each kind to the console (and log)
+    def FlushWarnings(self):
+        LogToFile([warningMessages.get(w["kind"], "Warning: {page} {detail}").format(page=w["page"], detail=w["detail"]) for w in self.warnings])
+        for kind, count in sorted(self.WarningCounts().items()):
+            logger(str(count) + " " + kind + " warnings (see the log file for the list)")
+
+    # *****************************************************************
+    # Output
+    def AsDictionary(self):
+        return {"phases": self.phases, "counters": self.counters, "warningCounts": self.WarningCounts(), "warnings": self.warnings}
+
+    def WriteJson(self, filepath):
+        with open(filepath, "w", encoding="utf-8") as file:
+            json.dump(self.AsDictionary(), file, indent=2, ensure_ascii=False)
+
+    # Write the profile (if we were profiling) in pstats format.  Look at it with: python -m pstats <filepath>
+    def WriteProfile(self, filepath):
+        if self.profiler != None:
+            self.profiler.dump_stats(filepath)
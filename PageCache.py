@@ -0,0 +1,121 @@
+# A persistent cache of scanned pages, so that successive backups only need the changed pages re-read
+#
+# Each PageRecord is stored in a SQLite database keyed by the zip entry name plus the entry's CRC32 and size from its ZipInfo.
+# (For a directory or a tar, the "CRC" is the entry's stamp: see Archives.)
+# A page whose key is already in the cache is unchanged since some earlier run and need not be decompressed or parsed again.
+
+import json
+import sqlite3
+import PageScanner
+
+# Bump this whenever a change to PageScanner or ReferenceExtractor would give different PageRecords for the same page source.
+# A cache written by a different version is discarded.
+cacheVersion=3
+
+# Rows which haven't been seen in this many runs are pruned
+keepRuns=4
+
+
+# *****************************************************************
+class PageCache:
+    def __init__(self, filepath):
+        self.db=sqlite3.connect(filepath)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS pages (entry TEXT, crc INTEGER, size INTEGER, redirect TEXT, refs TEXT, warnings TEXT, lastSeen INTEGER, PRIMARY KEY (entry, crc, size))")
+        if self.GetMeta("version") != str(cacheVersion):
+            self.Clear()
+        self.StartRun()
+
+    # Each archive we scan is a separate run.  A single PageCache can be used for a whole batch of runs.
+    def StartRun(self):
+        self.lastRun=int(self.GetMeta("run") or 0)
+        self.run=self.lastRun+1
+        self.countUnchanged=0
+        self.countChanged=0
+        self.countAdded=0
+        self.countDeleted=0
+        self.hits=[]        # The keys of the entries found by Lookup
+
+    def GetMeta(self, key):
+        row=self.db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        if row == None:
+            return None
+        return row[0]
+
+    def SetMeta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # Throw away everything.  (This is what --full does.)
+    def Clear(self):
+        self.db.execute("DELETE FROM pages")
+        self.db.execute("DELETE FROM meta")
+        self.SetMeta("version", cacheVersion)
+        self.db.commit()
+
+    # *****************************************************************
+    # entries is a list of (zipEntryName, nameZip, crc, size)
+    # Returns a list of the same length holding a PageRecord for each entry found in the cache and None for the rest
+    def Lookup(self, entries):
+        records=[]
+        lastRunNames={row[0] for row in self.db.execute("SELECT DISTINCT entry FROM pages WHERE lastSeen=?", (self.lastRun,))}
+        for zipEntryName, nameZip, crc, size in entries:
+            row=self.db.execute("SELECT redirect, refs, warnings FROM pages WHERE entry=? AND crc=? AND size=?", (zipEntryName, crc, size)).fetchone()
+            if row == None:
+                records.append(None)
+                if zipEntryName in lastRunNames:
+                    self.countChanged+=1
+                else:
+                    self.countAdded+=1
+                continue
+            self.countUnchanged+=1
+            self.hits.append((self.run, zipEntryName, crc, size))
+            record=PageScanner.PageRecord(zipEntryName, nameZip)
+            record.redirect=row[0]
+            if row[1] != None:
+                record.refs=json.loads(row[1])
+            record.warnings=json.loads(row[2])
+            records.append(record)
+        self.countDeleted=len(lastRunNames-{entry[0] for entry in entries})
+        return records
+
+    # *****************************************************************
+    # Store the PageRecords for the entries which Lookup didn't find, mark the ones it did find as seen, and prune anything which has gone stale
+    def Update(self, entries, records):
+        rows=[]
+        for (zipEntryName, nameZip, crc, size), record in zip(entries, records):
+            refs=None
+            if record.refs != None:
+                refs=json.dumps(record.refs, ensure_ascii=False)
+            rows.append((zipEntryName, crc, size, record.redirect, refs, json.dumps(record.warnings, ensure_ascii=False), self.run))
+        self.db.executemany("INSERT OR REPLACE INTO pages (entry, crc, size, redirect, refs, warnings, lastSeen) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.db.executemany("UPDATE pages SET lastSeen=? WHERE entry=? AND crc=? AND size=?", self.hits)
+        self.db.execute("DELETE FROM pages WHERE lastSeen<=?", (self.run-keepRuns,))
+        self.SetMeta("run", self.run)
+        self.db.commit()
+
+    def Close(self):
+        self.db.close()
+
+
+# *****************************************************************
+# Compare the records we got from the cache with freshly scanned ones.  Returns a list of the zip entry names which differ.
+def CompareRecords(cachedRecords, scannedRecords):
+    differences=[]
+    for cached, scanned in zip(cachedRecords, scannedRecords):
+        if (cached.redirect, cached.refs, cached.warnings) != (scanned.redirect, scanned.refs, scanned.warnings):
+            differences.append(cached.zipEntryName)
+    return differences
+
+
+# *****************************************************************
+# Scan the entries (a list of (zipEntryName, nameZip, crc, size)), reading only those pages which aren't already in the cache
+# Returns the list of PageRecords in the same order as the entries
+def ScanIncremental(archive, entries, cache, workers=None, pool=None, stats=None):
+    cache.StartRun()
+    records=cache.Lookup(entries)
+    missing=[i for i, record in enumerate(records) if record == None]
+    scanned=PageScanner.ScanArchive(archive, [entries[i][:2] for i in missing], workers=workers, pool=pool, stats=stats)
+    for i, record in zip(missing, scanned):
+        records[i]=record
+    cache.Update([entries[i] for i in missing], scanned)
+    return records
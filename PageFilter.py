@@ -0,0 +1,106 @@
+# Which zip entries are pages worth looking at?
+#
+# The rules are loaded from a text file (see PageFilters.txt) and compiled into a single matcher: one startswith() on a tuple of all the
+# prefixes, one endswith() on a tuple of all the suffixes and one regex which combines all the regexes.  Only when an entry is dropped are
+# the rules tried one at a time, to find which rule to count it against.
+
+import functools
+import os
+import re
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+
+# The rules used when no others are given
+defaultRulesFilepath=os.path.join(os.path.dirname(os.path.abspath(__file__)), "PageFilters.txt")
+
+ruleKinds=("prefix", "suffix", "regex")
+
+
+# *****************************************************************
+class FilterRule:
+    def __init__(self, kind, pattern):
+        if kind not in ruleKinds:
+            raise ValueError("unknown kind of rule '" + kind + "' (the kinds are " + ", ".join(ruleKinds) + ")")
+        self.kind=kind
+        self.pattern=pattern
+        self.regex=None
+        if kind == "regex":
+            try:
+                self.regex=re.compile(pattern)
+            except re.error as e:
+                raise ValueError("bad regex '" + pattern + "': " + str(e))
+
+    def Matches(self, name):
+        if self.kind == "prefix":
+            return name.startswith(self.pattern)
+        if self.kind == "suffix":
+            return name.endswith(self.pattern)
+        return self.regex.search(name) != None
+
+    def __str__(self):
+        return self.kind + " " + self.pattern
+
+
+# *****************************************************************
+class PageFilter:
+    def __init__(self, rules):
+        self.rules=rules
+        self.prefixes=tuple(rule.pattern for rule in rules if rule.kind == "prefix")
+        self.suffixes=tuple(rule.pattern for rule in rules if rule.kind == "suffix")
+        regexes=[rule.pattern for rule in rules if rule.kind == "regex"]
+        self.regex=None
+        if len(regexes) > 0:
+            self.regex=re.compile("|".join("(?:" + regex + ")" for regex in regexes))
+        self.StartRun()
+
+    # The counts are per run (i.e., per archive)
+    def StartRun(self):
+        self.countChecked=0
+        self.countNotPages=0                        # Entries which aren't page sources at all
+        self.dropped=[0]*len(self.rules)            # The number of entries dropped by each rule
+
+    # Return the page's name (without the "source/" and ".txt") or None if the entry is to be ignored
+    def Check(self, filenameZip):
+        self.countChecked+=1
+        name=WikidotHelpers.InterestingFilenameZip(filenameZip)
+        if name == None:
+            self.countNotPages+=1
+            return None
+        if not (name.startswith(self.prefixes) or name.endswith(self.suffixes) or (self.regex != None and self.regex.search(name) != None)):
+            return name
+        for i, rule in enumerate(self.rules):
+            if rule.Matches(name):
+                self.dropped[i]+=1
+                break
+        return None
+
+    def CountDropped(self):
+        return sum(self.dropped)
+
+    # A list of (rule, count of entries dropped), for every rule, in the order of the rules file
+    def DroppedByRule(self):
+        return list(zip(self.rules, self.dropped))
+
+
+# *****************************************************************
+# Load the rules from a rules file.  Raises ValueError (with the file and line) if a rule is bad.
+def LoadPageFilter(filepath=defaultRulesFilepath):
+    rules=[]
+    with open(filepath, encoding="utf-8") as file:
+        for lineNumber, line in enumerate(file, 1):
+            line=line.strip()
+            if len(line) == 0 or line.startswith("#"):
+                continue
+            parts=line.split(None, 1)
+            if len(parts) < 2:
+                raise ValueError(filepath + " line " + str(lineNumber) + ": a rule needs a kind and a pattern")
+            try:
+                rules.append(FilterRule(parts[0], parts[1]))
+            except ValueError as e:
+                raise ValueError(filepath + " line " + str(lineNumber) + ": " + str(e))
+    return PageFilter(rules)
+
+
+# The filter made from the default rules file, loaded the first time it's wanted
+@functools.lru_cache(maxsize=1)
+def DefaultPageFilter():
+    return LoadPageFilter(defaultRulesFilepath)
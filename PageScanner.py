@@ -0,0 +1,154 @@
+# Single-pass scanning of a Wikidot backup (a zip, a directory or a tar: see Archives)
+#
+# Each interesting entry is streamed exactly once and classified as either a redirect or a content page.
+# Only the first chunk is needed to spot a redirect.  For content pages the raw references are extracted from the byte chunks as they
+# are decompressed, so a page's source is never held in memory (or decoded) as a whole.
+# The work is spread across a pool of worker processes.  Each worker gets a chunk of entries from the archive's Chunks() (opening its
+# own handle on a zip file, for instance) and returns a list of PageRecords which the main process merges in archive order.
+#
+# The workers deliberately return *raw* names: the main process cannonicizes them and records their display names in the run's
+# WikidotHelpers.NameRegistry (in SortPages and BuildGraph), in archive order, whichever process scanned them.
+
+import collections
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import ReferenceExtractor
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+
+
+# *****************************************************************
+# What we learned about a single zip entry
+class PageRecord:
+    def __init__(self, zipEntryName, nameZip):
+        self.zipEntryName=zipEntryName  # The name of the entry in the zip file (or its equivalent in a directory or tar)
+        self.nameZip=nameZip            # The page name as derived from the zip entry name (not yet cannonicized)
+        self.redirect=None              # If the page is a redirect, the raw (uncannonicized) destination
+        self.refs=None                  # If the page is a content page, the list of raw references found on it. None if the page is empty.
+        self.warnings=[]                # Warnings for the main process to record, each a [kind, page] pair (see Metrics.warningMessages)
+
+
+# *****************************************************************
+# How much work a scan did.  The times are summed over all the worker processes.
+class ScanStats:
+    def __init__(self):
+        self.countPages=0           # Pages read
+        self.bytesRead=0            # Bytes of page source decompressed
+        self.countRefs=0            # References extracted
+        self.readSeconds=0.0        # Time spent opening pages, reading their first chunk and checking for redirects
+        self.extractSeconds=0.0     # Time spent extracting references (including decompressing the rest of each content page)
+
+    def Add(self, other):
+        self.countPages+=other.countPages
+        self.bytesRead+=other.bytesRead
+        self.countRefs+=other.countRefs
+        self.readSeconds+=other.readSeconds
+        self.extractSeconds+=other.extractSeconds
+
+
+# The size of the chunks in which page source is read
+readChunkSize=1 << 16
+
+# Redirect pages start (after any whitespace) with this
+redirectMarker='[[module redirect destination="'
+
+
+# *****************************************************************
+# Read and classify a single page from an open archive.  This is the unit of work done by the worker processes.
+def ScanPage(archive, zipEntryName, nameZip, stats):
+    start=time.perf_counter()
+    record=PageRecord(zipEntryName, nameZip)
+    stats.countPages+=1
+    with archive.OpenPage(zipEntryName) as stream:
+        head=stream.read(readChunkSize)
+        stats.bytesRead+=len(head)
+        if len(head) == 0:
+            record.warnings.append(["empty-page", zipEntryName])
+            return record
+
+        # Is this a redirect?  Only a page which starts with the marker can be, so only those pages are decoded.
+        if head[:256].decode("utf-8", "ignore").lstrip().lower().startswith(redirectMarker):
+            rest=stream.read()
+            stats.bytesRead+=len(rest)
+            head+=rest
+            redir=WikidotHelpers.RedirectTarget(head.decode("utf-8", "replace"))     # (Decoded like the references: one bad byte mustn't stop the run)
+            if redir != None:
+                if WikidotHelpers.CannonicizeZipName(nameZip) != WikidotHelpers.CannonicizeZipName(redir):
+                    record.redirect=redir
+                    stats.readSeconds+=time.perf_counter()-start
+                    return record
+                # Circular redirects are treated as (reference-free) content pages
+                record.warnings.append(["circular-redirect", WikidotHelpers.CannonicizeZipName(nameZip)])
+
+        middle=time.perf_counter()
+        record.refs=ReferenceExtractor.ExtractTargetsFromChunks(StreamChunks(head, stream, stats))
+    stats.countRefs+=len(record.refs)
+    stats.readSeconds+=middle-start
+    stats.extractSeconds+=time.perf_counter()-middle
+    return record
+
+
+# *****************************************************************
+# Yield the chunk already read, followed by the rest of the stream.  Chunks with no "[[[" in them go straight through without being decoded.
+def StreamChunks(head, stream, stats):
+    if len(head) > 0:
+        yield head
+    while True:
+        chunk=stream.read(readChunkSize)
+        if len(chunk) == 0:
+            return
+        stats.bytesRead+=len(chunk)
+        yield chunk
+
+
+# *****************************************************************
+# Scan one chunk of entries.  Each call opens the archive for itself so that it can run in a separate process.
+# Returns the list of PageRecords and a ScanStats
+def ScanChunk(archive, entries):
+    records=[]
+    stats=ScanStats()
+    with archive:
+        for zipEntryName, nameZip in entries:
+            records.append(ScanPage(archive, zipEntryName, nameZip, stats))
+    return records, stats
+
+
+# *****************************************************************
+# Scan a list of (zipEntryName, nameZip) pairs from an archive (see Archives) using a pool of worker processes
+# Returns the list of PageRecords in the same order as the entries
+# workers<=1 scans in-process, which is handy for debugging
+# If pool (a ProcessPoolExecutor) is supplied it is used instead of starting a new one, so that a batch of archives can share a warm pool.
+# If stats (a ScanStats) is supplied, the work done is added to it.
+def ScanArchive(archive, entries, workers=None, chunkSize=500, pool=None, stats=None):
+    if workers == None:
+        workers=os.cpu_count() or 1
+    chunks=archive.Chunks(entries, chunkSize)
+    if workers <= 1 or len(entries) <= chunkSize:
+        with archive:       # (So that the chunks share one handle on a zip file rather than each opening it again)
+            return MergeChunks((ScanChunk(chunkArchive, chunkEntries) for chunkArchive, chunkEntries in chunks), stats)
+
+    if pool != None:
+        return MergeChunks(MapChunks(pool, chunks, 2*workers), stats)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return MergeChunks(MapChunks(pool, chunks, 2*workers), stats)
+
+
+# Hand the chunks to the pool, keeping no more than inFlight of them queued at once, and yield the results in order.
+# (Executor.map() would take every chunk up front, which for a tar means holding all of its pages in memory.)
+def MapChunks(pool, chunks, inFlight):
+    pending=collections.deque()
+    for chunkArchive, chunkEntries in chunks:
+        pending.append(pool.submit(ScanChunk, chunkArchive, chunkEntries))
+        if len(pending) >= inFlight:
+            yield pending.popleft().result()
+    while len(pending) > 0:
+        yield pending.popleft().result()
+
+
+def MergeChunks(chunkResults, stats):
+    records=[]
+    for chunkRecords, chunkStats in chunkResults:
+        records.extend(chunkRecords)
+        if stats != None:
+            stats.Add(chunkStats)
+    return records
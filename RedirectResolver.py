@@ -0,0 +1,93 @@
+# Resolution of redirect chains
+#
+# Redirects frequently point to other redirects: a->b, b->c, or longer.  We want every redirect to point to the ultimate end of its chain.
+# Each chain is walked only once: as soon as a walk reaches a redirect which has already been resolved, it stops and takes that
+# redirect's answer (path compression), so the whole job is linear in the number of redirects.
+
+# *****************************************************************
+# What we found while resolving the redirects
+class RedirectReport:
+    def __init__(self):
+        self.loops=[]           # A list of redirect loops, each a list of the cannonicized names in the loop, in redirect order
+        self.inLoops={}         # A dictionary of all redirects which end up in a loop (whether or not they are part of it), with the loop's first member
+        self.dangling={}        # A dictionary of redirects whose final destination does not exist, with that destination
+        self.chainLengths={}    # A histogram: the key is the number of hops from a redirect to a real page, the value is the count of redirects with that many hops
+        self.longestChain=[]    # The longest chain found, as a list of names starting with the redirect and ending with its destination
+        self.redirectsTo={}     # The reverse index: the key is a final destination, the value is the list of redirects which end up there
+
+    def MaxChainLength(self):
+        if len(self.chainLengths) == 0:
+            return 0
+        return max(self.chainLengths)
+
+    def MeanChainLength(self):
+        count=sum(self.chainLengths.values())
+        if count == 0:
+            return 0
+        return sum(length*n for length, n in self.chainLengths.items())/count
+
+
+# *****************************************************************
+# Resolve the redirects dictionary (cannonicized name -> cannonicized name it redirects to)
+# existingPages, if supplied, is used to spot redirects to pages which do not exist.
+# Returns a new dictionary in which each redirect points to the end of its chain, and a RedirectReport.
+# Redirects which lead into a loop are pointed at the loop's first member.
+def ResolveRedirects(redirects, existingPages=None):
+    report=RedirectReport()
+    resolved={}     # The final destination of each redirect
+    hops={}         # The number of hops from each redirect to its final destination (loops are not counted)
+
+    for start in redirects:
+        if start in resolved:
+            continue
+
+        # Walk the chain until we get to a page which isn't a redirect, a redirect which we've already resolved, or a loop
+        path=[]
+        onPath={}
+        node=start
+        tailHops=0
+        inLoop=False
+        while True:
+            if node in resolved:
+                final=resolved[node]
+                tailHops=hops.get(node, 0)
+                inLoop=node in report.inLoops
+                break
+            if node not in redirects:
+                final=node
+                break
+            if node in onPath:
+                final=node
+                inLoop=True
+                report.loops.append(path[onPath[node]:])
+                break
+            onPath[node]=len(path)
+            path.append(node)
+            node=redirects[node]
+
+        # Everything on the path shares the same final destination
+        sources=report.redirectsTo.setdefault(final, [])
+        for i, name in enumerate(path):
+            resolved[name]=final
+            sources.append(name)
+            if inLoop:
+                report.inLoops[name]=final
+                continue
+            hops[name]=len(path)-i+tailHops
+            report.chainLengths[hops[name]]=report.chainLengths.get(hops[name], 0)+1
+            if existingPages != None and final not in existingPages:
+                report.dangling[name]=final
+        if not inLoop and len(path) > 0 and hops[path[0]] > len(report.longestChain)-1:
+            report.longestChain=path+[final] if tailHops == 0 else path+ChainFrom(redirects, node)
+
+    return resolved, report
+
+
+# *****************************************************************
+# List the chain of names from a redirect to its final destination
+def ChainFrom(redirects, name):
+    chain=[name]
+    while name in redirects and len(chain) <= len(redirects):
+        name=redirects[name]
+        chain.append(name)
+    return chain
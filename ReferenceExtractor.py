@@ -0,0 +1,119 @@
+# Extraction of page references from Wikidot page source
+#
+# A reference is a string inside a pair of triple square brackets: [[[<target>]]] or [[[<target>|<display text>]]]
+# The target may be prefixed by "*" (open in a new window) and may carry an "#anchor".
+# The source is scanned once by a single compiled regex; no intermediate split strings are built.
+
+import re
+
+# The reference body may not contain brackets.  This means that a run of brackets like "[[[[name]]]]" is treated as a literal "["
+# followed by the reference [[[name]]] followed by a literal "]", which is what Wikidot does.
+#   group 1: the target, without any leading "*" and without any "#anchor"
+#   group 2: the display text, if any
+referencePattern=re.compile(r"\[\[\[\*?([^\[\]|#]*)(?:#[^\[\]|]*)?(?:\|([^\[\]]*))?\]\]\]")
+# The same, capturing only the target (for when the display text isn't wanted, findall() then returns just the targets)
+targetPattern=re.compile(r"\[\[\[\*?([^\[\]|#]*)(?:#[^\[\]|]*)?(?:\|[^\[\]]*)?\]\]\]")
+
+
+# *****************************************************************
+# Is this reference target a link to somewhere outside the wiki?
+# (Only a target with a ":" in it can be one, and checking for that first saves lower-casing every target.)
+def IsExternalTarget(target):
+    return ":" in target and ("://" in target or target.lower().startswith(("http:", "https:", "mailto:")))
+
+
+# *****************************************************************
+# Turn the groups of a referencePattern match into a (target, display text) pair, or None if the reference is to be skipped
+def MakeReference(target, display):
+    target=target.strip()
+    if len(target) == 0 or IsExternalTarget(target):
+        return None
+    if display != None:
+        display=display.strip()
+    if display == None or len(display) == 0:
+        return (target, target)
+    return (target, display)
+
+
+# *****************************************************************
+# Scan a page's source and yield a (target, display text) pair for each reference to another page in the wiki.
+# External links and pure anchors (e.g. [[[#top]]]) are skipped.  When there is no display text, the target is returned as the display text.
+def ExtractReferences(source):
+    for match in referencePattern.finditer(source):
+        reference=MakeReference(match.group(1), match.group(2))
+        if reference != None:
+            yield reference
+
+
+# *****************************************************************
+# Return a list of the targets of all references on a page
+def ExtractTargets(source):
+    if "[[[" not in source:
+        return []
+    return KeepTargets(targetPattern.findall(source))
+
+
+# Strip the targets found by targetPattern, dropping the empty ones and the external links
+def KeepTargets(found):
+    targets=[]
+    for target in found:
+        target=target.strip()
+        if len(target) > 0 and not IsExternalTarget(target):
+            targets.append(target)
+    return targets
+
+
+# *****************************************************************
+# The same thing for UTF-8 page source arriving as a series of byte chunks (e.g. from ZipFile.open())
+# Brackets, "|" and "#" are ASCII and so never occur inside a multi-byte UTF-8 character, which lets us match on the raw bytes.
+# Only the matched spans are decoded.  A chunk with no references in it is never decoded at all.
+referencePatternBytes=re.compile(referencePattern.pattern.encode("ascii"))
+targetPatternBytes=re.compile(targetPattern.pattern.encode("ascii"))
+bracketPatternBytes=re.compile(rb"[\[\]]")
+
+
+def ExtractReferencesFromChunks(chunks):
+    for match in MatchChunks(chunks, referencePatternBytes):
+        display=match.group(2)
+        if display != None:
+            display=display.decode("utf-8", "replace")
+        reference=MakeReference(match.group(1).decode("utf-8", "replace"), display)
+        if reference != None:
+            yield reference
+
+
+def ExtractTargetsFromChunks(chunks):
+    return KeepTargets(match.group(1).decode("utf-8", "replace") for match in MatchChunks(chunks, targetPatternBytes))
+
+
+# Yield the matches of pattern (referencePatternBytes or targetPatternBytes) in the chunks
+# A reference left open at the end of a chunk is carried over to the next one.  While nothing but bracket-free text has followed its "[[[",
+# a chunk with no brackets in it can't close it (or end it), so that chunk is just added to the carry without searching the carry again.
+# That keeps an unclosed "[[[" early in a large page from making the scan quadratic.
+def MatchChunks(chunks, pattern):
+    carry=[]            # The end of the source which might be the start of a reference continued in the next chunk
+    carryOpen=False     # Is the carry a "[[[" followed by nothing but bracket-free text?
+    for chunk in chunks:
+        if carryOpen and bracketPatternBytes.search(chunk) == None:
+            carry.append(chunk)
+            continue
+        buffer=b"".join(carry)+chunk if len(carry) > 0 else chunk
+        lastEnd=0
+        for match in pattern.finditer(buffer):
+            yield match
+            lastEnd=match.end()
+
+        # Hang on to anything which might be the start of a reference continued in the next chunk.
+        # A reference can't contain a bracket, so only the last "[[[" can start one, and only if what follows it is bracket-free
+        # (apart from a "]" or "]]" at the very end, which may be the start of its "]]]").  If there's no such "[[[", a trailing "[" or "[[" might start one.
+        start=buffer.rfind(b"[[[", lastEnd)
+        carryOpen=False
+        if start >= 0:
+            bracket=bracketPatternBytes.search(buffer, start+3)
+            if bracket == None:
+                carryOpen=True
+            elif buffer[bracket.start():] not in (b"]", b"]]"):
+                start=-1
+        if start < 0:
+            start=max(lastEnd, len(buffer)-2)
+        carry=[buffer[start:]]
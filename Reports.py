@@ -0,0 +1,191 @@
+# The reports written at the end of an analysis
+# Each report is a text file whose name is prepended with the date, e.g. "2019-09-22 Most Wanted Pages.txt"
+
+import os
+import time
+
+
+# *****************************************************************
+# Write all the reports for an AnalysisResult into outputDir
+def WriteReports(result, outputDir=".", day=None, referencedThreshold=7, wantedThreshold=5, topK=None, importantCount=100):
+    # We'll prepend the file name with the date.  Get the date string
+    if day == None:
+        day=time.strftime("%Y-%m-%d")
+    prefix=os.path.join(outputDir, day+" ")
+
+    WriteSummaryStatistics(result, prefix+"Summary Statistics.txt")
+    WriteRankedReports(result, prefix, referencedThreshold, wantedThreshold, topK)
+    if result.importance != None:
+        WriteMostImportantWantedPages(result, prefix+"Most Important Wanted Pages.txt", importantCount)
+    WriteAllMissingReferences(result, prefix+"All Missing References.txt")
+    WritePages(result, prefix+"Pages.txt")
+
+
+# *****************************************************************
+# Summary statistics
+def WriteSummaryStatistics(result, filepath):
+    file=open(filepath, "w")
+    print("||||~ Summary Statistics ||", file=file)
+    print("||~ Kind ||~ Number ||~ Notes ||", file=file)
+    print("|| Pages with content ||", result.countContentPages, "|| All pages that have text on them. ||", file=file)
+    print("|| Redirects ||", result.countRedirects, "|| Pages which redirect to a content page. (The content page itself does not necessarily yet exist.) ||", file=file)
+    print("|| Total existing pages ||", result.countPages, "|| Pages with content plus redirects ||", file=file)
+    print("|| Pages still needed ||", result.graph.CountBacklinkedNames() - result.countContentPages - result.countRedirects, "|| Pages which are referred to, but which have not yet been created ||", file=file)
+    print("|| Total references ||", result.countTotalRefs, "|| A count of how many links to other pages exist in all existing pages ||", file=file)
+    file.close()
+
+
+# *****************************************************************
+# A report which ranks pages by their reference count
+# We generate one line in the table for each *value* of reference count (i.e., all pages with 50 references are in a single row of the table.)
+# Only counts above the threshold are listed.  If topK is given, no more rows are written once topK pages have been listed.
+# (Rows are never split, so the last row may take the total a little past topK.)
+class RankedReport:
+    def __init__(self, filename, threshold, topK=None, include=None):
+        self.filename=filename      # The report's name, which follows the date in the file name
+        self.threshold=threshold
+        self.topK=topK
+        self.include=include        # A function of (graph, id) which says whether a page belongs in this report.  None means all pages do.
+        self.lines=[]               # The report is buffered here until it is written
+        self.count=0                # The number of pages listed so far
+
+    def Done(self, count):
+        return count <= self.threshold or (self.topK != None and self.count >= self.topK)
+
+
+# Year pages (e.g. "1984") are referred to from everywhere and would swamp the Most Referenced Pages report
+def IsNotYear(graph, id):
+    name=graph.Name(id)
+    return not (len(name) == 4 and name.isdecimal() and (name.startswith("19") or name.startswith("20")))
+
+
+def IsMissing(graph, id):
+    return not graph.Exists(id)
+
+
+# *****************************************************************
+# Group all referenced pages by reference count.  Returns a dictionary: count -> list of IDs, each list in order of first reference.
+def BucketByCount(graph):
+    buckets={}
+    for id in graph.ReferencedIds():
+        count=graph.RefCount(id)
+        bucket=buckets.get(count)
+        if bucket == None:
+            buckets[count]=[id]
+        else:
+            bucket.append(id)
+    return buckets
+
+
+# *****************************************************************
+# Fill in all the ranked reports in a single pass over the reference counts, from the highest count down
+def RankPages(graph, reports, names):
+    buckets=BucketByCount(graph)
+    for count in sorted(buckets, reverse=True):
+        active=[report for report in reports if not report.Done(count)]
+        if len(active) == 0:
+            break
+        for report in active:
+            line=[]
+            for id in buckets[count]:
+                if report.include == None or report.include(graph, id):
+                    line.append("[[[" + names.DisplayName(graph.Name(id)) + "]]]")
+            if len(line) > 0:
+                report.lines.append("|| " + str(count) + " || " + ", ".join(line) + " ||\n")
+                report.count+=len(line)
+
+
+# *****************************************************************
+# Most Referenced Pages and Most Wanted (i.e., most referenced missing) Pages
+def WriteRankedReports(result, prefix, referencedThreshold=7, wantedThreshold=5, topK=None):
+    reports=[RankedReport("Most Referenced Pages.txt", referencedThreshold, topK, IsNotYear),
+             RankedReport("Most Wanted Pages.txt", wantedThreshold, topK, IsMissing)]
+    RankPages(result.graph, reports, result.names)
+    for report in reports:
+        with open(prefix+report.filename, "w") as file:
+            file.write("".join(report.lines))
+
+
+# *****************************************************************
+# The missing pages with the highest importance (see LinkRank), one to a row, with their reference counts for comparison
+# An importance of 1 is what the average page gets.  Equal importance is ordered by reference count, then by name.
+def WriteMostImportantWantedPages(result, filepath, count=100):
+    graph=result.graph
+    scores=result.importance.scores
+    missing=sorted(graph.MissingIds(), key=lambda id: (-scores[id], -graph.RefCount(id), graph.Name(id)))
+    file=open(filepath, "w")
+    print("||~ Rank ||~ Page ||~ Importance ||~ References ||", file=file)
+    for rank, id in enumerate(missing[:count], 1):
+        print("|| " + str(rank) + " || [[[" + result.names.DisplayName(graph.Name(id)) + "]]] || " + "%.2f" % scores[id] + " || " + str(graph.RefCount(id)) + " ||", file=file)
+    file.close()
+
+
+# *****************************************************************
+# Next we create a list of missing pages and where they're referenced
+def WriteAllMissingReferences(result, filepath):
+    graph=result.graph
+    file=open(filepath, "w")
+    for id in graph.MissingIds():
+        name=graph.Name(id)
+        if graph.BacklinkCount(id) == 0:
+            if name in result.redirectReport.redirectsTo:
+                result.metrics.Warn("unused-redirect-only", name)
+            else:
+                result.metrics.Warn("no-backlinks", name)
+            continue
+
+        line=name+ " <--- "+"".join([graph.Name(link)+", " for link in graph.Backlinks(id)])
+        try:                            # Foreign characters in the names can fail to encode in the platform's default encoding
+            print(line, file=file)
+        except UnicodeEncodeError:
+            result.metrics.Warn("unicode", name)
+
+    file.close()
+
+
+# *****************************************************************
+# Print the list of all references
+def WritePages(result, filepath):
+    file=open(filepath, "w")
+    for id in result.graph.ExistingIds():
+        print(result.names.DisplayName(result.graph.Name(id)), file=file)
+    file.close()
+
+
+# *****************************************************************
+# What happened to the wanted pages between two backups (a BackupDiff.WikiDelta), using the display names in names (a NameRegistry)
+def WriteWantedPagesChanges(delta, filepath, names):
+    def Link(name):
+        return "[[[" + names.DisplayName(name) + "]]]"
+
+    file=open(filepath, "w", encoding="utf-8")
+    print("Changes from " + str(delta.oldLabel) + " to " + str(delta.newLabel) + ": " + str(delta.countAdded) + " pages added, " +
+          str(delta.countChanged) + " changed, " + str(delta.countDeleted) + " deleted", file=file)
+
+    print("\n||||~ Newly wanted pages ||", file=file)
+    for name, count in sorted(delta.NewlyWanted(), key=lambda x: (-x[1], x[0])):
+        print("|| " + Link(name) + " || " + str(count) + " ||", file=file)
+
+    print("\n||||||||~ Wanted pages whose reference count changed ||", file=file)
+    print("||~ Page ||~ Was ||~ Now ||~ Change ||", file=file)
+    for name, oldCount, newCount in sorted(delta.CountChanges(), key=lambda x: (x[1]-x[2], x[0])):
+        print("|| " + Link(name) + " || " + str(oldCount) + " || " + str(newCount) + " || " + "%+d" % (newCount-oldCount) + " ||", file=file)
+
+    print("\n||||~ Wanted pages which have been created ||", file=file)
+    for name, count in sorted(delta.Created(), key=lambda x: (-x[1], x[0])):
+        print("|| " + Link(name) + " || " + str(count) + " ||", file=file)
+
+    print("\n||||~ Wanted pages which are no longer referenced ||", file=file)
+    for name, count in sorted(delta.NoLongerWanted(), key=lambda x: (-x[1], x[0])):
+        print("|| " + Link(name) + " || " + str(count) + " ||", file=file)
+
+    # The new links to missing pages, in the same form as All Missing References
+    print("\nNew broken links:", file=file)
+    for name in sorted(delta.brokenLinks):
+        print(name + " <--- " + "".join([source + ", " for source in sorted(delta.gainedLinks[name])]), file=file)
+
+    # And the links to missing pages which have gone, taken out of a page or deleted along with it
+    print("\nRemoved broken links:", file=file)
+    for name in sorted(delta.removedLinks):
+        print(name + " <--- " + "".join([source + ", " for source in sorted(delta.lostLinks[name])]), file=file)
+    file.close()
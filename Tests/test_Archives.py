@@ -0,0 +1,92 @@
+# Tests of Archives' error handling
+# Run from the top of the repository:  python -m pytest Tests  (or python -m unittest discover -s Tests -t .)
+
+import os
+import tempfile
+import unittest
+import zipfile
+import Archives
+import WantedPagesEnumerator
+
+
+# Write a zip backup holding the given pages (a dictionary of page name: source)
+def WriteBackup(zipFilepath, pages):
+    with zipfile.ZipFile(zipFilepath, "w", compression=zipfile.ZIP_STORED) as zip:
+        for name, source in pages.items():
+            zip.writestr("source/" + name + ".txt", source)
+
+
+# *****************************************************************
+class TestArchiveErrors(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir=tempfile.TemporaryDirectory()
+        self.addCleanup(self.workDir.cleanup)
+
+    def Path(self, name):
+        return os.path.join(self.workDir.name, name)
+
+    # A backup whose page doesn't match its CRC
+    def WriteDamagedBackup(self, zipFilepath):
+        WriteBackup(zipFilepath, {"good": "[[[Somewhere]]]", "bad": "xxxx [[[Elsewhere]]] xxxx"})
+        with open(zipFilepath, "rb") as file:
+            data=file.read()
+        with open(zipFilepath, "wb") as file:
+            file.write(data.replace(b"xxxx [[[", b"yyyy [[["))
+
+    def testNotAnArchive(self):
+        with open(self.Path("notes.txt"), "w") as file:
+            file.write("not a backup")
+        with self.assertRaises(Archives.ArchiveError):
+            Archives.OpenArchive(self.Path("notes.txt"))
+        with self.assertRaises(Archives.ArchiveError):
+            Archives.OpenArchive(self.Path("missing.zip"))
+
+    def testDamagedPage(self):
+        self.WriteDamagedBackup(self.Path("damaged.zip"))
+        options=WantedPagesEnumerator.AnalysisOptions(workers=1, rankImportance=False)
+        with self.assertRaises(Archives.ArchiveError) as raised:
+            WantedPagesEnumerator.Analyze(self.Path("damaged.zip"), options)
+        self.assertIn("source/bad.txt", str(raised.exception))
+
+    # A backup which can't be read is logged and skipped; the others still get their reports
+    def testMainCarriesOn(self):
+        self.WriteDamagedBackup(self.Path("damaged.zip"))
+        WriteBackup(self.Path("good.zip"), {"home": "[[[Somewhere]]]"})
+        status=WantedPagesEnumerator.Main([self.Path("damaged.zip"), self.Path("good.zip"), "--output-dir", self.Path("out"),
+                                           "--cache", self.Path("cache.sqlite"), "--workers", "1", "--no-importance"])
+        self.assertEqual(status, 1)
+        with open(os.path.join(self.Path("out"), "damaged", "log.txt"), encoding="utf-8") as file:
+            self.assertIn("ERROR: ", file.read())
+        self.assertTrue(any(name.endswith("Most Wanted Pages.txt") for name in os.listdir(os.path.join(self.Path("out"), "good"))))
+
+
+    # A page which isn't valid UTF-8 isn't a damaged backup: it's read (with the bad bytes replaced) like any other
+    def testBadBytesInRedirect(self):
+        WriteBackup(self.Path("bad.zip"), {"cafe": "[[[Caf\u00e9]]]", "home": "[[[Caf\u00e9]]] [[[Somewhere]]]"})
+        with zipfile.ZipFile(self.Path("bad.zip"), "a") as zip:
+            zip.writestr("source/cafe-redirect.txt", b'[[module Redirect destination="Caf\xe9"]]')
+        WriteBackup(self.Path("good.zip"), {"home": "[[[Somewhere]]]"})
+        status=WantedPagesEnumerator.Main([self.Path("bad.zip"), self.Path("good.zip"), "--output-dir", self.Path("out"),
+                                           "--cache", self.Path("cache.sqlite"), "--workers", "1", "--no-importance"])
+        self.assertEqual(status, 0)
+        for name in ("bad", "good"):
+            self.assertTrue(any(report.endswith("Most Wanted Pages.txt") for report in os.listdir(os.path.join(self.Path("out"), name))))
+        options=WantedPagesEnumerator.AnalysisOptions(workers=1, rankImportance=False)
+        result=WantedPagesEnumerator.Analyze(self.Path("bad.zip"), options)
+        self.assertEqual(result.countRedirects, 1)
+
+
+    # The library leaves no files behind: only the command line keeps a page cache by default
+    def testAnalyzeWritesNothing(self):
+        WriteBackup(self.Path("good.zip"), {"home": "[[[Somewhere]]]"})
+        os.makedirs(self.Path("cwd"))
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.Path("cwd"))
+        result=WantedPagesEnumerator.Analyze(self.Path("good.zip"))
+        self.assertEqual(result.countPages, 1)
+        self.assertEqual(os.listdir(self.Path("cwd")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
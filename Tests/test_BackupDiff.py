@@ -0,0 +1,52 @@
+# Tests of diff mode (BackupDiff and WantedPagesEnumerator.DiffArchives)
+# Run from the top of the repository:  python -m pytest Tests  (or python -m unittest discover -s Tests -t .)
+
+import os
+import tempfile
+import unittest
+import GraphSnapshot
+import PageFilter
+import WantedPagesEnumerator
+from Tests.test_Archives import WriteBackup
+
+
+# *****************************************************************
+class TestDiffArchives(unittest.TestCase):
+
+    def testWantedPagesChanges(self):
+        with tempfile.TemporaryDirectory() as workDir:
+            archives=[os.path.join(workDir, "2020-01-01.zip"), os.path.join(workDir, "2020-02-01.zip")]
+            WriteBackup(archives[0], {"home": "[[[Bob Tucker]]] [[[Lee Hoffman]]]", "fanzine": "[[[Lee Hoffman]]]", "nav_top": "[[[Home]]]"})
+            WriteBackup(archives[1], {"home": "[[[Bob Tucker]]] [[[Smof]]]", "fanzine": "[[[Lee Hoffman]]]", "nav_top": "[[[Home]]]", "bob-tucker": "[[[Home]]]"})
+            options=WantedPagesEnumerator.AnalysisOptions(workers=1, rankImportance=False)
+            options.pageFilter=PageFilter.DefaultPageFilter()
+            WantedPagesEnumerator.DiffArchives(archives, options, workDir, day="day")
+            with open(os.path.join(workDir, "day Wanted Pages Changes.txt"), encoding="utf-8") as file:
+                report=file.read()
+
+        # The page filter's counts are for the last archive only
+        self.assertEqual(options.pageFilter.countChecked, 4)
+        self.assertEqual(options.pageFilter.CountDropped(), 1)
+
+        newBroken=report[report.index("New broken links:"):report.index("Removed broken links:")]
+        removedBroken=report[report.index("Removed broken links:"):]
+        self.assertIn("smof <--- home, ", newBroken)
+        self.assertIn("lee-hoffman <--- home, ", removedBroken)
+        self.assertNotIn("bob-tucker", removedBroken)      # Bob Tucker was created, but the link to it is still there
+
+
+    # A --since file which isn't there is reported as missing, and isn't created
+    def testMissingSnapshot(self):
+        with tempfile.TemporaryDirectory() as workDir:
+            filepath=os.path.join(workDir, "typo.sqlite")
+            with self.assertRaisesRegex(GraphSnapshot.SnapshotError, "no such file"):
+                GraphSnapshot.LoadSnapshot(filepath)
+            self.assertFalse(os.path.exists(filepath))
+            with open(filepath, "w") as file:
+                file.write("not a database")
+            with self.assertRaisesRegex(GraphSnapshot.SnapshotError, "is not a graph snapshot"):
+                GraphSnapshot.LoadSnapshot(filepath)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+# Tests of Metrics
+# Run from the top of the repository:  python -m pytest Tests  (or python -m unittest discover -s Tests -t .)
+
+import os
+import tempfile
+import unittest
+import WantedPagesEnumerator
+from Tests.test_Archives import WriteBackup
+
+
+# *****************************************************************
+class TestRunMetrics(unittest.TestCase):
+
+    # The cannonicization caches are process-wide, but each run counts only its own use of them
+    def testCannonicizeCachesPerRun(self):
+        with tempfile.TemporaryDirectory() as workDir:
+            zipFilepath=os.path.join(workDir, "backup.zip")
+            WriteBackup(zipFilepath, {"home": "[[[Bob Tucker]]] [[[Fanzine]]]", "fanzine": "[[[Home]]] [[[Lee Hoffman]]]"})
+            options=WantedPagesEnumerator.AnalysisOptions(workers=1, rankImportance=False)
+            runs=[WantedPagesEnumerator.Analyze(zipFilepath, options).metrics.counters for i in range(2)]
+        # The second run finds every name already cached.  (So it never gets as far as CannonicizeString, which CannonicalAndRealNames calls on a miss.)
+        lookups=runs[0]["CannonicalAndRealNamesHits"]+runs[0]["CannonicalAndRealNamesMisses"]
+        self.assertGreater(lookups, 0)
+        self.assertEqual(runs[1]["CannonicalAndRealNamesHits"], lookups)
+        for name in ("CannonicizeString", "CannonicalAndRealNames"):
+            self.assertEqual(runs[1][name+"Misses"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+# Tests of PageScanner
+# Run from the top of the repository:  python -m pytest Tests  (or python -m unittest discover -s Tests -t .)
+
+import os
+import tempfile
+import tracemalloc
+import unittest
+import zipfile
+import Archives
+import PageScanner
+
+# Big enough that holding a whole page would stand out against the handful of read chunks the scanner should need
+largePageSize=8000000
+
+
+# *****************************************************************
+class TestLargePages(unittest.TestCase):
+
+    # A content page is streamed: the peak memory is a few read chunks (the chunk being scanned, the carry, and zipfile's and zlib's
+    # buffers), however large the page is, and whether or not it has references in it
+    def testPeakMemory(self):
+        pages={"plain": ("fan history " * (largePageSize//12)).encode("utf-8"),
+               "references": b"".join(b"x"*65000 + b" [[[Page %d|shown]]] " % i for i in range(largePageSize//65000))}
+        with tempfile.TemporaryDirectory() as workDir:
+            zipFilepath=os.path.join(workDir, "large.zip")
+            for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                with zipfile.ZipFile(zipFilepath, "w", compression=compression) as zip:
+                    for name, source in pages.items():
+                        zip.writestr("source/" + name + ".txt", source)
+                with Archives.ZipArchive(zipFilepath) as archive:
+                    for name in pages:
+                        stats=PageScanner.ScanStats()
+                        tracemalloc.start()
+                        try:
+                            record=PageScanner.ScanPage(archive, "source/" + name + ".txt", name, stats)
+                            peak=tracemalloc.get_traced_memory()[1]
+                        finally:
+                            tracemalloc.stop()
+                        self.assertEqual(stats.bytesRead, len(pages[name]))
+                        self.assertEqual(len(record.refs), pages[name].count(b"[[["))
+                        self.assertLess(peak, 8*PageScanner.readChunkSize, (name, compression))
+
+
+if __name__ == "__main__":
+    unittest.main()
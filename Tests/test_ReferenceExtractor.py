@@ -0,0 +1,115 @@
+# Tests of ReferenceExtractor
+# Run from the top of the repository:  python -m pytest Tests  (or python -m unittest discover -s Tests -t .)
+
+import random
+import time
+import unittest
+import ReferenceExtractor
+import WikidotHelpers.WikidotHelpers as WikidotHelpers
+from Benchmarks.BenchmarkExtractor import LegacyExtract, MakePageSource
+
+
+# Split bytes into pieces at the given offsets
+def Split(source, cuts):
+    cuts=sorted(cuts)
+    return [source[i:j] for i, j in zip([0]+cuts, cuts+[len(source)])]
+
+
+def Cannonical(targets):
+    return [WikidotHelpers.CannonicalAndRealNames(target)[0] for target in targets]
+
+
+# *****************************************************************
+# The regex extractor against the split("[[[") loop it replaced (Benchmarks.BenchmarkExtractor.LegacyExtract)
+# Each fixture page has the targets the old loop found and the targets ExtractTargets finds.  Once cannonicized, they must differ only by the
+# fixes made by WithFixes().  ("*Fanzine" and " Fanzine " are both the page "fanzine", but a target's spelling is what a report displays.)
+fixturePages=[
+    ("See [[[Bob Tucker]]] and [[[Lee Hoffman|Lee]]].",
+        ["Bob Tucker", "Lee Hoffman"], ["Bob Tucker", "Lee Hoffman"]),
+    ("[[[*Fanzine]]] [[[*Smof|smofs]]] [[[ Émile Greenleaf |Émile]]] [[[Lee Hoffman | Lee ]]]",
+        ["*Fanzine", "*Smof", " Émile Greenleaf ", "Lee Hoffman "], ["Fanzine", "Smof", "Émile Greenleaf", "Lee Hoffman"]),
+    ("[[[*http://example.com|elsewhere]]] [[[Worldcon]]]",
+        ["Worldcon"], ["Worldcon"]),
+    # Brackets: the displayed names lose the "["
+    ("[[[[Hugo Award]]]] and [[[[fan:Bjo Trimble|Bjo]]]]",
+        ["[Hugo Award", "[fan:Bjo Trimble"], ["Hugo Award", "fan:Bjo Trimble"]),
+    # External links with "http:" at position 0
+    ("[[[http://fancyclopedia.org/worldcon]]] [[[https://example.com|elsewhere]]] [[[Worldcon]]]",
+        ["http://fancyclopedia.org/worldcon", "https://example.com", "Worldcon"], ["Worldcon"]),
+    # Anchors
+    ("[[[Worldcon#history]]] and [[[#top]]] and [[[Fanzine#x|fanzines]]]",
+        ["Worldcon#history", "#top", "Fanzine#x"], ["Worldcon", "Fanzine"]),
+    # Empty targets (the old loop counted references to the pages "nothing" and "")
+    ("[[[|nothing]]] [[[ ]]] [[[Open",
+        ["|nothing", " "], []),
+    # A "]]]" before the first "[[[" (the old loop took the text in front of it for a reference)
+    ("Text with [[brackets]] and a stray ]]] before the first [[[Worldcon]]]",
+        ["Text with [[brackets]] and a stray ", "Worldcon"], ["Worldcon"]),
+]
+
+
+# The old loop's targets with the regex extractor's fixes applied to them
+def WithFixes(legacyTargets):
+    fixed=[]
+    for target in legacyTargets:
+        target=target.lstrip("[")           # "[[[[name]]]]" is "[" + [[[name]]] + "]", not a reference to "[name"
+        if "[" in target or "]" in target:  # A reference can't contain brackets
+            continue
+        if target.startswith("|"):          # "[[[|display]]]" has no target
+            target=""
+        target=target.split("#")[0]         # Anchors are stripped, and pure anchors skipped
+        if len(target.strip()) == 0 or target.lower().startswith(("http:", "https:")):     # External links are skipped, even with "http:" at position 0
+            continue
+        fixed.append(target)
+    return fixed
+
+
+class TestAgainstOldLoop(unittest.TestCase):
+
+    def testFixturePages(self):
+        for source, legacyTargets, targets in fixturePages:
+            self.assertEqual(LegacyExtract(source), legacyTargets, source)
+            self.assertEqual(ReferenceExtractor.ExtractTargets(source), targets, source)
+            self.assertEqual(Cannonical(targets), Cannonical(WithFixes(legacyTargets)), source)
+
+    # Generated pages (with plain, "|display", "[[[[x]]]]", "*http://" and "#anchor" references): apart from the fixes, the same pages are referenced
+    def testGeneratedPages(self):
+        for seed in range(20):
+            source=MakePageSource(20000, seed=seed)
+            self.assertEqual(Cannonical(ReferenceExtractor.ExtractTargets(source)), Cannonical(WithFixes(LegacyExtract(source))))
+
+
+# *****************************************************************
+class TestChunks(unittest.TestCase):
+
+    # However the source is split into chunks, the references found are the same as when it's read whole
+    def testSameAsWhole(self):
+        rng=random.Random(1)
+        pieces=["[", "]", "|", "#", "*", "a", "b", " ", "é", "[[[", "]]]"]
+        for i in range(5000):
+            source="".join(rng.choice(pieces) for j in range(rng.randint(0, 40)))
+            data=source.encode("utf-8")
+            cuts=rng.sample(range(len(data)+1), min(len(data)+1, rng.randint(0, 6)))
+            references=list(ReferenceExtractor.ExtractReferences(source))
+            self.assertEqual(list(ReferenceExtractor.ExtractReferencesFromChunks(Split(data, cuts))), references, source)
+            self.assertEqual(ReferenceExtractor.ExtractTargetsFromChunks(Split(data, cuts)), [target for target, display in references], source)
+            self.assertEqual(ReferenceExtractor.ExtractTargets(source), [target for target, display in references], source)
+
+    def testReferenceAcrossChunks(self):
+        data="x [[[Émile Greenleaf|Émile]]] y".encode("utf-8")
+        for cut in range(len(data)+1):
+            self.assertEqual(list(ReferenceExtractor.ExtractReferencesFromChunks(Split(data, [cut]))), [("Émile Greenleaf", "Émile")])
+
+    # An unclosed "[[[" at the top of a large page used to be searched again with every chunk, making the scan quadratic
+    def testUnclosedReference(self):
+        for opening in (b"[[[", b"[[[a]", b"[[[a|b"):
+            data=opening+b"x "*2000000+b" [[[foo]]] [[[bar"
+            start=time.perf_counter()
+            targets=ReferenceExtractor.ExtractTargetsFromChunks(data[i:i+65536] for i in range(0, len(data), 65536))
+            elapsed=time.perf_counter()-start
+            self.assertEqual(targets, ["foo"])
+            self.assertLess(elapsed, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
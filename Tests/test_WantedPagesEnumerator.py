@@ -0,0 +1,26 @@
+# Tests of WantedPagesEnumerator's analysis
+# Run from the top of the repository:  python -m pytest Tests  (or python -m unittest discover -s Tests -t .)
+
+import os
+import tempfile
+import unittest
+import WantedPagesEnumerator
+from Tests.test_Archives import WriteBackup
+
+
+# *****************************************************************
+class TestAnalyze(unittest.TestCase):
+
+    # A page in a category is "source/<category>_<name>.txt" in the zip, and is the page <category>:<name>
+    def testCategoryPages(self):
+        with tempfile.TemporaryDirectory() as workDir:
+            zipFilepath=os.path.join(workDir, "backup.zip")
+            WriteBackup(zipFilepath, {"home": "[[[fan:Bob Tucker]]] [[[fan:Lee Hoffman]]]", "fan_bob-tucker": "[[[Home]]]"})
+            result=WantedPagesEnumerator.Analyze(zipFilepath, WantedPagesEnumerator.AnalysisOptions(workers=1, rankImportance=False))
+        graph=result.graph
+        self.assertEqual(sorted(graph.Name(id) for id in graph.ExistingIds()), ["fan:bob-tucker", "home"])
+        self.assertEqual([graph.Name(id) for id in graph.MissingIds()], ["fan:lee-hoffman"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,325 +1,391 @@
-import tkinter as tk
-from tkinter import filedialog
-import zipfile
+import os
+import sys
 import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import Archives
+import BackupDiff
+import GraphSnapshot
+import LinkGraph
+import LinkRank
+import Metrics
+import PageCache
+import PageFilter
+import PageScanner
+import RedirectResolver
+import Reports
+from Log import logger, LogToFile, OpenLog, CloseLog
 import WikidotHelpers.WikidotHelpers as WikidotHelpers
 #TODO: Need to deal with accented letter (e.g. Farmer)
 #TODO: Need to deal with embedded hyperlinks (e.g., Ansible)
 #TODO: Need to deal with ALL-CAPS (are we ignoring all of the pages we ought to be?)
 
-log = open("log.txt", "w")
 
-def logger(message):
-    print(message, file=log)
-    print(message)
+# *****************************************************************
+# The knobs which control an analysis
+class AnalysisOptions:
+    def __init__(self, workers=None, cacheFilepath=None, fullRebuild=False, verifyCache=False, traceMemory=False, profile=False, keepState=False, pageFilter=None, useMmap=False, rankImportance=True):
+        self.workers=workers                # The number of worker processes used to scan the backup (None means one per CPU)
+        self.cacheFilepath=cacheFilepath    # The page cache which lets us skip pages unchanged since an earlier run (None, the default, means no cache; the command line uses one)
+        self.fullRebuild=fullRebuild        # Ignore (and rebuild) the page cache
+        self.verifyCache=verifyCache        # Check that every page taken from the cache matches a fresh scan of the page
+        self.traceMemory=traceMemory        # Track peak memory with tracemalloc (which slows things down considerably)
+        self.profile=profile                # Run the main process under cProfile
+        self.keepState=keepState            # Keep a BackupDiff.WikiState of the backup in the result, so that it can be saved as a graph snapshot
+        self.pageFilter=pageFilter          # The PageFilter which decides which pages to ignore (None means the rules in PageFilters.txt)
+        self.useMmap=useMmap                # Read the pages of an unpacked backup through mmap
+        self.rankImportance=rankImportance  # Rank the pages by importance (see LinkRank), for the Most Important Wanted Pages report
+        self.cache=None                     # An open PageCache to use in place of opening cacheFilepath (batch runs share one)
+        self.pool=None                      # A ProcessPoolExecutor to use in place of starting a new one (batch runs share one)
+
 
+# *****************************************************************
+# Everything we learned about a wiki
+class AnalysisResult:
+    def __init__(self):
+        self.archivePath=None       # The backup: a zip file, a directory or a tar file
+        self.countPages=0           # Count of all pages with content, including redirects
+        self.countContentPages=0
+        self.countRedirects=0
+        self.countTotalRefs=0
+        self.redirects={}           # Dictionary of redirects.  The key is a cannonicized name, the value is the cannonicized name that it is ultimately redirected to.
+        self.redirectReport=None    # The RedirectReport from resolving the redirects
+        self.graph=None             # The LinkGraph of content pages and their references
+        self.importance=None        # The LinkRank.Importance of the pages in the graph (None if it wasn't wanted or numpy isn't installed)
+        self.names=WikidotHelpers.NameRegistry()    # The display names of the pages
+        self.state=None             # If AnalysisOptions.keepState, the BackupDiff.WikiState of the backup
+        self.metrics=Metrics.RunMetrics()   # Timings, counters and warnings
 
 
 # *****************************************************************
-# Should this filename be ignored?
-# This routine is highly wiki-dependent
-# Return value is either the cleaned filename or None if the file should be ignored.
-def InterestingFilenameZip(filenameZip):
-
-    if not filenameZip.startswith("source/"):    # We're only interested in source files
-        return None
-    if len(filenameZip) <= 11:  # There needs to be something there besides just 'source/.txt'
-           return None
-
-    # These files are specific to Fancyclopedia and are known to be ignorable
-    if filenameZip.startswith("source/deleted_"):   # Ignore deleted pages
-        return None
-    if filenameZip.startswith("source/nav_"):   # Ignore navigation pages
-        return None
-    if filenameZip.startswith("source/forum_"):   # Ignore forum pages
-        return None
-    if filenameZip.startswith("source/testing_"):   # These are test pages of various sorts
-        return None
-    if filenameZip.startswith("source/system_"):   # Ignore system pages
-        return None
-    if filenameZip.startswith("source/admin_"):   # Ignore system admin pages
-        return None
-    if filenameZip.startswith("source/search_"):   # Ignore system search pages
-        return None
-    if filenameZip.startswith("source/index_"):   # Ignore our index pages
-        return None
-    if filenameZip.startswith("source/most-wanted-pages"): # Ignore the *previous* most-wanted-pages page
-        return None
-    bars=["conbar1", "bidbar1", "westerconbar1", "showbar1", "fanbar1", "worldconbar1", "probar1", "genbar1", "bookbar1", "linkbar1"]
-    for bar in bars:
-        if filenameZip.startswith("source/"+bar):
-            return None
-
-    return filenameZip[7:-4]  # Drop "source/" and ".txt", returning the cleaned name
+# Analyze a Wikidot backup: the zip file, or a directory it has been unpacked into, or a tar of that directory
+# The work is done in phases, each of which fills in more of the AnalysisResult.  (The benchmarks time the phases separately.)
+def Analyze(archivePath, options=None):
+    if options == None:
+        options=AnalysisOptions()
+    archive=Archives.OpenArchive(archivePath, options.useMmap)
+
+    result=AnalysisResult()
+    result.archivePath=archivePath
+    metrics=result.metrics=Metrics.RunMetrics(options.traceMemory, options.profile)
+    metrics.Start()
+    with metrics.Phase("list"):
+        pageFilter=options.pageFilter or PageFilter.DefaultPageFilter()
+        pageFilter.StartRun()
+        entries=ListEntries(archive, pageFilter)
+        LogPageFilter(pageFilter, metrics)
+    with metrics.Phase("scan"):
+        stats=PageScanner.ScanStats()
+        records=ScanPages(archive, entries, options, stats, metrics)
+    with metrics.Phase("classify"):
+        contentPages=SortPages(result, records)
+    with metrics.Phase("redirects"):
+        ResolveRedirectChains(result, contentPages)
+    with metrics.Phase("aggregation"):
+        BuildGraph(result, contentPages)
+        result.names.Finish()
+    if options.rankImportance:
+        with metrics.Phase("importance"):
+            RankImportance(result)
+    if options.keepState:
+        with metrics.Phase("state"):
+            result.state=BackupDiff.WikiState.FromRecords(archivePath, entries, records)
+
+    metrics.Count("entries", len(entries))
+    metrics.Count("pagesScanned", stats.countPages)
+    metrics.Count("bytesDecompressed", stats.bytesRead)
+    metrics.Count("refsExtracted", stats.countRefs)
+    metrics.counters["scanReadSeconds"]=stats.readSeconds           # Summed over the worker processes
+    metrics.counters["scanExtractSeconds"]=stats.extractSeconds
+    metrics.Count("pages", result.countPages)
+    metrics.Count("contentPages", result.countContentPages)
+    metrics.Count("redirects", result.countRedirects)
+    metrics.Count("references", result.countTotalRefs)
+    metrics.Count("missingPages", len(result.graph.MissingIds()))
+    metrics.CountCannonicizeCaches()
+    return result
 
 
 # *****************************************************************
+# Walk through the archive (see Archives), looking only at source pages.  Each entry is checked against the page filter (by default, the rules in PageFilters.txt) just once.
+# Returns a list of (zipEntryName, nameZip, crc, size), where for a directory or a tar the "crc" is the entry's stamp
+def ListEntries(archive, pageFilter=None):
+    if pageFilter == None:
+        pageFilter=PageFilter.DefaultPageFilter()
+    entries=[]
+    with archive:
+        for filename, stamp, size in archive.Entries():
+            nameZip=pageFilter.Check(filename)
+            if nameZip == None:
+                continue
+            entries.append((filename, WikidotHelpers.ConvertZipCategoryMarker(nameZip), stamp, size))    # Convert the Zip category marker to the Wikidot category marker
+    return entries
+
+
 # *****************************************************************
-# Main
-# Navigate to the zipped backup file which is to be analyzed, open it, and read it
-root = tk.Tk()
-root.withdraw()
-zipFilepath = filedialog.askopenfilename()
-if not zipfile.is_zipfile(zipFilepath):
-    exit()
-zip = zipfile.ZipFile(zipFilepath)
-
-redirects = {}      # Dictionary of redirects.  The key is a cannonicized name, the value is the cannonicized name that it is ultimately redirected to.
-countPages=0        # Count of all pages with content, including redirects
-
-# Walk through the zip file, looking only at source pages.
-zipEntryNames = zip.namelist()
-for zipEntryName in zipEntryNames:
-    nameZip=InterestingFilenameZip(zipEntryName)
-    if nameZip == None:
-        continue
-    source = WikidotHelpers.ReadPageSourceFromZip(zip, zipEntryName)
-    if source == None:
-        continue
-
-    countPages += 1
-    nameZip=WikidotHelpers.ConvertZipCategoryMarker(nameZip)    # Convert the Zip category marker to the Wikidot category marker
-
-    # Is this a redirect?
-    redir = WikidotHelpers.IsRedirect(source)
-    if redir != None:
-        # If so, add it to the redirect dictionary
-        name=WikidotHelpers.CannonicizeZipName(nameZip)
-        if name == redir:  # Skip circular redirects
-            logger("Warning: '" + name + " is a circular redirect reference")
-            continue
-        redirects[name] = redir
-        continue
+# Log how many entries the page filter dropped, and which rules dropped them, so that the rules can be tuned
+def LogPageFilter(pageFilter, metrics=None):
+    logger("Page filter: " + str(pageFilter.countChecked) + " entries, " + str(pageFilter.countNotPages) + " not page sources, " + str(pageFilter.CountDropped()) + " dropped by the rules")
+    LogToFile(["    " + str(count).rjust(7) + "  " + str(rule) for rule, count in pageFilter.DroppedByRule()])
+    if metrics != None:
+        metrics.Count("entriesNotPages", pageFilter.countNotPages)
+        for rule, count in pageFilter.DroppedByRule():
+            metrics.counters["dropped by " + str(rule)]=count
 
-countRedirects=len(redirects)
 
-# Now that we've analyzed the entire zip file, we need to trace all the redirect chains and make sure that every redirect points to the ultimate end of its chain.
+# *****************************************************************
+# Read each page exactly once, sorting it into redirects and content pages.  The heavy lifting is spread across a pool of worker processes.
+# Pages which are unchanged since an earlier run are taken from the page cache instead.  (A cacheFilepath of None means don't use a cache.)
+# Returns the list of PageRecords
+def ScanPages(archive, entries, options, stats=None, metrics=None):
+    if options.cache == None and options.cacheFilepath == None:
+        return PageScanner.ScanArchive(archive, [entry[:2] for entry in entries], workers=options.workers, pool=options.pool, stats=stats)
+
+    cache=options.cache
+    if cache == None:
+        cache=PageCache.PageCache(options.cacheFilepath)
+    if options.fullRebuild:
+        cache.Clear()
+    records=PageCache.ScanIncremental(archive, entries, cache, workers=options.workers, pool=options.pool, stats=stats)
+    if options.cache == None:
+        cache.Close()
+    logger("Page cache: " + str(cache.countUnchanged) + " unchanged, " + str(cache.countChanged) + " changed, " + str(cache.countAdded) + " added, " + str(cache.countDeleted) + " deleted")
+    if metrics != None:
+        metrics.Count("cacheHits", cache.countUnchanged)
+        metrics.Count("cacheMisses", cache.countChanged+cache.countAdded)
+    if options.verifyCache:
+        differences=PageCache.CompareRecords(records, PageScanner.ScanArchive(archive, [entry[:2] for entry in entries], workers=options.workers, pool=options.pool))
+        for zipEntryName in differences:
+            if metrics != None:
+                metrics.Warn("cache-mismatch", zipEntryName)
+        logger("Cache verification complete: " + str(len(differences)) + " differences")
+    return records
+
+
+# *****************************************************************
+# Sort the PageRecords into redirects (which go in result.redirects) and content pages
+# Returns a list of (cannonicized name, PageRecord) for each non-redirect page, in zip order
+def SortPages(result, records):
+    # The redirects are done first, so that (as far as the display names are concerned) their names come before the content pages' names
+    names=result.names
+    redirects = {}      # Dictionary of redirects.  The key is a cannonicized name, the value is the cannonicized name that it is redirected to.
+    for record in records:
+        result.countPages += 1
+        for kind, page in record.warnings:
+            result.metrics.Warn(kind, page)
+        if record.redirect != None:     # Is this a redirect?  If so, add it to the redirect dictionary
+            target=names.AddWritten(record.redirect)
+            redirects[names.AddPageName(record.nameZip)] = target
+
+    contentPages=[]
+    for record in records:
+        if record.redirect == None:
+            contentPages.append((names.AddPageName(record.nameZip), record))
+
+    result.redirects=redirects
+    result.countRedirects=len(redirects)
+    return contentPages
+
+
+# *****************************************************************
+# Now that we've analyzed the entire backup, we need to trace all the redirect chains and make sure that every redirect points to the ultimate end of its chain.
 # I.e., right now we have many instances of a->b, b->c (or even longer).  We want this to be a->c and b->c.
-for n in redirects:
-    redirectPath={}     # Used to check for redirect loops
-    while redirects.get(redirects[n]) != None:  # Is the page we're redirecting to also a redirect?
-        if redirectPath.get(redirects[n]) != None:  # Has the redirect list looped?
-            logger("ERROR: '" + n +"' is a redirect in a redirect loop")
-            break
-        redirectPath[redirects[n]]=True
-        redirects[n] = redirects[redirects[n]]
-
-logger("Redirects analysis complete: redirects.len=" + str(countRedirects))
-
-# Next we go through the *non*-redirect pages and create a list of their references and the inverse list of the referring pages
-pagesRefs = {}      # The dictionary of pages, indexed by the name of a page and holding a list of references on that page
-pagesBacklinks = {} # The dictionary of references, indexed by the name of a page and holding a list of pages that reference it
-existingPages={}    # A dictionary of all cannonicized names of existing, both content pages and redirects.  There will be an entry for each existing page (this allows easy lookup)
-missingPages={}     # A dictionary of cannonicized names of pages which are referenced, but which do not exist.   There will be an entry for each existing page (this allows easy lookup)
-countContentPages=0
-for zipEntryName in zipEntryNames:
-    nameZip=InterestingFilenameZip(zipEntryName)
-    name=WikidotHelpers.CannonicizeZipName(nameZip)
-    if name == None:
-        continue
-    if redirects.get(name) != None:  # Skip redirects
-        continue
-
-    existingPages[name] = True  # Add it to the list of all cannonicized, interesting names
-
-    # Load the page's source
-    source = WikidotHelpers.ReadPageSourceFromZip(zip, zipEntryName)  # Skip empty pages
-    if source == None or len(source) == 0:
-        logger("Warning: Page '"+zipEntryName+"' is empty.")
-        continue
-
-    # We need to find all the references in the page.  A reference is a string inside a pair of triple square brackets, i.e., [[[string]]]
-    # We'll start by spliting the page on "[[[". This will yield a list of strings, each starting with a reference which ends with "]]]", usually followed by junk.
-
-    # Step #1 is to deal (crudely for now) with the case of "[[[[" which is "[" followed by "[[[". Ideally, we'd handle any number of successive "["s,
-    # but the actual data only has "[[[[" and it's not clear what longer sequences would mean, anyway.
-    # So for now, we'll kludge it by turning the "extra" '[' into a parenthesis.
-    # Ditto for ']'
-    source.replace("[[[[", "([[[")
-    source.replace("]]]]", "]]])")
-
-    # Now locate the "[[[<reference>]]]" sequences
-    splitSource = source.split("[[[")
-    rawPageRefs = []       # Refs will be a list of all the references found in this source page
-    for r in splitSource:
-        if r.find("]]]") < 1:   # If the string doesn't contain reference closing brackets ("]]]"), then it's a leading string of junk which must be skipped.
-            continue
-        ref = r.split("]]]")    # If it does contain "]]]", then there's a reference to be found.  The format of the string is <reference>]]]<trailing stuff>.
-        if ref == None:         # If there's nothing to be found, skip it.
+def ResolveRedirectChains(result, contentPages):
+    contentPageNames={name: True for name, record in contentPages if result.redirects.get(name) == None}
+    result.redirects, result.redirectReport=RedirectResolver.ResolveRedirects(result.redirects, contentPageNames)
+    redirectReport=result.redirectReport
+    for loop in redirectReport.loops:
+        result.metrics.Warn("redirect-loop", loop[0], "'" + "' -> '".join(loop) + "' -> '" + loop[0] + "'")
+    for name in redirectReport.dangling:
+        result.metrics.Warn("dangling-redirect", name, redirectReport.dangling[name])
+    logger("Redirect chains: longest=" + str(redirectReport.MaxChainLength()) + " (" + " -> ".join(redirectReport.longestChain) + "), mean=" + "%.2f" % redirectReport.MeanChainLength() +
+           ", loops=" + str(len(redirectReport.loops)) + ", dangling=" + str(len(redirectReport.dangling)))
+    logger("Redirects analysis complete: redirects.len=" + str(result.countRedirects))
+
+
+# *****************************************************************
+# Next we go through the *non*-redirect pages and add each one, with the list of its references, to the link graph.
+# The graph works out the inverse list of the referring pages, the reference counts and the missing pages.
+def BuildGraph(result, contentPages):
+    redirects=result.redirects
+    graph=LinkGraph.LinkGraph()
+    graph.AddRedirects(redirects)
+    for name, record in contentPages:
+        if redirects.get(name) != None:  # Skip pages which share a name with a redirect
             continue
-        if len(ref) < 1:        # A null reference
+
+        if record.refs == None:     # Empty pages exist, but have no references
+            result.metrics.Warn("no-references", name)
+            graph.AddPage(name, None)
             continue
-        if ref[0] != None and len(ref) > 0: # The part we want ("<reference>" from the comment above) will be in ref[0].  Make sure it exists.
-            if ref[0].find("|") > 0:    # Look for references containing "|".  These are of the form <reference name>|<display name>.  We want just the reference name.
-                ref[0]=ref[0][:ref[0].find("|")]
-            if ref[0].find("http:") > 0:    # We don't want references which are actually outside Wikidot
-                logger("Warning: '" + name + "' contains an empty reference")
-                continue
-            refCan=WikidotHelpers.CannonicizeZipName(ref[0])
-            rawPageRefs.append(refCan)
-            WikidotHelpers.AddUncannonicalName(ref[0], refCan)
-
-    countContentPages += 1
-
-    # Take all the references we've collected from this source page, make sure any redirects are followed through to the end, and update the refPages dict.
-    # RefsPages[name] contains a list of all pages which refer *to* the source pages "name".
-    resolvedPageRefs = []
-    for r in rawPageRefs:  # r is a reference to another page contained in page n
-        if redirects.get(r) == None:    # Make sure each ref is fully redirected
-            resolvedPageRefs.append(r)
-        else:
-            resolvedPageRefs.append(redirects[r])
-
-        if pagesBacklinks.get(r) == None:
-            pagesBacklinks[r]={}
-        if pagesBacklinks[r].get(name) == None:
-            pagesBacklinks[r][name]=True
-
-    # PagesRefs[name], OTOH, contains a list of all pages referred to by source page "name"
-    pagesRefs[name] = resolvedPageRefs
-
-logger("Source reference analysis complete: " + str(len(pagesRefs)) + " pages found with references")
-
-# We now have a list of all content pages and each of those pages has a list of pages referenced
-# We want to gather some statistics and make some lists of interesting pages:
-# * How many pages total? (names.len())
-# * How many content pages?  (names.len()-redirects.len())
-# * How many redirects?     (redirects.len())
-# * How many references total?
-# * How many missing pages?
-# * List of all missing pages references 10 or more times
-# * List of most referenced pages
-
-# Create the list of missing pages
-for name in existingPages:
-    if pagesRefs.get(name) == None:
-        logger("Warning: '"+name+"' is in existingPages, but is not in pageRefs")
-        continue
-    for ref in pagesRefs[name]:
-        if existingPages.get(ref) == None:
-            missingPages[ref]=True
-
-# We need to count the number of references each page has.
-countTotalRefs = 0
-countRefs = {}  # A dictionary of pages with reference counts for that page
-for name in existingPages:
-    if pagesRefs.get(name) != None:
-        for r in pagesRefs[name]:
-            if countRefs.get(r) == None:
-                countRefs[r] = 0
-            countRefs[r] += 1
-            countTotalRefs += 1
-
-# It's output time!
-# We'll prepend the file name with the date.  Get the date string
-day=time.strftime("%Y-%m-%d")
-
-# Summary statistics
-file=open(day+" Summary Statistics.txt", "w")
-print("||||~ Summary Statistics ||", file=file)
-print("||~ Kind ||~ Number ||~ Notes ||", file=file)
-print("|| Pages with content ||", countContentPages, "|| All pages that have text on them. ||", file=file)
-print("|| Redirects ||", countRedirects, "|| Pages which redirect to a content page. (The content page itself does not necessarily yet exist.) ||", file=file)
-print("|| Total existing pages ||", countPages, "|| Pages with content plus redirects ||", file=file)
-print("|| Pages still needed ||", len(pagesBacklinks) - countContentPages - countRedirects, "|| Pages which are referred to, but which have not yet been created ||", file=file)
-print("|| Total references ||", countTotalRefs, "|| A count of how many links to other pages exist in all existing pages ||", file=file)
-file.close()
-
-# Most Referenced Pages
-file=open(day+" Most Referenced Pages.txt", "w")
-
-# We generate one line in the table for each *value* of reference count (i.e., all pages with 50 references are in a single row of the table.)
-# First sort countRefs into descending order.  To do this, we turn it into a list of tuples(name, count)
-countRefTuples = []
-for name in countRefs:
-    countRefTuples.append((name, countRefs[name]))
-countRefTuples.sort(key=lambda n: n[1], reverse=True)
-
-currentNum=-1
-line=""
-for crt in countRefTuples:
-    if crt[1] != currentNum:
-        if len(line)>0:
-            print("||", currentNum, "||", line, "||", file=file)
-            line=""
-        currentNum=crt[1]
-
-    if currentNum <= 7:
-        break
-
-    if len(crt[0]) == 4 and crt[0].isdecimal() and (crt[0].startswith("19") or crt[0].startswith("20")):
-        continue    # Skip the year entries
-    if len(line)>0:
-        line=line+", "  # The first entry is not preceded by a comma
-    line= line +"[[[" + WikidotHelpers.UncannonicizeZipName(crt[0]) + "]]]"
-
-file.close()
-
-# Most requested pages
-file=open(day+" Most Wanted Pages.txt", "w")
-
-# Go through the dictionary and copy just the tuples missing pages.
-missingPagesTuples=[]
-for crt in countRefTuples:
-    if existingPages.get(crt[0]) == None:
-        missingPagesTuples.append(crt)
-
-# Sort what's left
-missingPagesTuples.sort(key=lambda n: n[1], reverse=True)
-
-# We generate one line in the table for each *value* of reference count (i.e., all pages with 50 references are listed in a single row of the table.)
-currentNum=-1
-line=""
-for mp in missingPagesTuples:
-    if mp[1] != currentNum:
-        if len(line)>0:
-            print("||", currentNum, "||", line, "||", file=file)
-            line=""
-        currentNum=mp[1]
-
-    if currentNum <= 5:
-        break
-
-    if len(line)>0:
-        line=line+", "
-    line= line +"[[[" + WikidotHelpers.UncannonicizeZipName(mp[0]) + "]]]"
-
-file.close()
-
-# Next we create a list of missing pages and where they're referenced
-file=open(day+" All Missing References.txt", "w")
-for name in missingPages:
-    if pagesBacklinks.get(name) == None:
-        found=False
-        for r in redirects:
-            if redirects[r] == name:
-                found=True
-                break
-        if found:
-            logger("Warning: '" + name + "' does not exist and is referred to only by an unused redirect")
-        else:
-            logger("Warning: '" + name + "' is in missingPages but is not in pagesBacklinks")
-        continue
-
-    line=name+ " <--- "
-    for link in pagesBacklinks[name]:
-        line=line+link +", "
-    try:                            # This double-try scheme is to deal foreign characters in, first referring pages, and then missing pages
-        print(line, file=file)
-    except UnicodeEncodeError:
-        try:
-            logger("ERROR: '" + name + "' has a referring page which caused a UnicodeEncodeError")
-        except UnicodeEncodeError:
-            logger("ERROR: a missing page's name caused a UnicodeEncodeError")
+
+        # The raw references were extracted by the scan.  Cannonicize them here so that we keep track of the real names.
+        rawPageRefs = [result.names.AddWritten(ref) for ref in record.refs]     # Refs will be a list of all the references found in this source page
+
+        result.countContentPages += 1
+        graph.AddPage(name, rawPageRefs)
+
+    graph.Finish()
+    logger("Source reference analysis complete: " + str(result.countContentPages) + " pages found with references")
+    result.countTotalRefs=graph.CountRefs()
+    result.graph=graph
+
+
+# *****************************************************************
+# Rank the pages by importance.  This needs numpy (and is much faster with scipy); without it, the Most Important Wanted Pages report is skipped.
+def RankImportance(result):
+    importance=LinkRank.RankImportance(result.graph)
+    if importance == None:
+        logger("Importance ranking skipped: it needs numpy, which is not installed")
+        return
+    logger("Importance ranking: " + str(importance.iterations) + " iterations in %.2fs (%s), final change %.1e" % (importance.seconds, importance.method, importance.delta))
+    result.metrics.Count("importanceIterations", importance.iterations)
+    result.metrics.counters["importanceSeconds"]=importance.seconds
+    result.importance=importance
+
+
+# *****************************************************************
+# Compare each backup with the one before it and write a Wanted Pages Changes report for each comparison.
+# The first backup is compared with the graph snapshot sinceFilepath if one is given; otherwise it is just the starting point.
+# Only the starting backup is scanned in full (and then only if there's no snapshot).  After that, only the pages which changed are read.
+# With more than one comparison, each comparison's report goes in a subdirectory of the output directory named after the later backup.
+# Returns the final WikiState.
+def DiffArchives(archives, options, outputDir=".", sinceFilepath=None, day=None):
+    if day == None:
+        day=time.strftime("%Y-%m-%d")
+    names=WikidotHelpers.NameRegistry()         # The names accumulate over the whole series of backups
+    state=None
+    if sinceFilepath != None:
+        state=GraphSnapshot.LoadSnapshot(sinceFilepath, names)
+        logger("Loaded graph snapshot of " + str(state.label) + " from " + sinceFilepath)
+    comparisons=len(archives) if state != None else len(archives)-1
+
+    for archivePath in archives:
+        archive=Archives.OpenArchive(archivePath, options.useMmap)
+        start=time.perf_counter()
+        pageFilter=options.pageFilter or PageFilter.DefaultPageFilter()
+        pageFilter.StartRun()
+        entries=ListEntries(archive, pageFilter)
+        LogPageFilter(pageFilter)
+        if state == None:
+            state=BackupDiff.WikiState.FromRecords(archivePath, entries, ScanPages(archive, entries, options), names)
+            logger("Read " + archivePath + " in full: " + str(len(entries)) + " pages in %.2fs" % (time.perf_counter()-start))
             continue
 
-file.close()
+        changed=state.ChangedEntries(entries)
+        records=PageScanner.ScanArchive(archive, [entry[:2] for entry in changed], workers=options.workers, pool=options.pool)
+        delta=state.Update(archivePath, entries, records)
+        logger("Compared " + str(delta.oldLabel) + " with " + archivePath + ": " + str(delta.countAdded) + " pages added, " + str(delta.countChanged) + " changed, " +
+               str(delta.countDeleted) + " deleted, " + str(len(delta.changes)) + " pages' counts changed, in %.2fs" % (time.perf_counter()-start))
+
+        reportDir=outputDir
+        if comparisons > 1:
+            reportDir=os.path.join(outputDir, Archives.ArchiveName(archivePath))
+            os.makedirs(reportDir, exist_ok=True)
+        Reports.WriteWantedPagesChanges(delta, os.path.join(reportDir, day+" Wanted Pages Changes.txt"), names)
+    return state
 
-# Print the list of all references
-file=open(day+" Pages.txt", "w")
-for name in existingPages:
-    print(WikidotHelpers.UncannonicizeZipName(name), file=file)
-file.close()
 
-exit
+# *****************************************************************
+# Ask for a zipped backup using a file dialog.  Tkinter is only imported here, so that everything else runs on headless machines.
+def AskForZipFilepath():
+    import tkinter as tk
+    from tkinter import filedialog
+    root = tk.Tk()
+    root.withdraw()
+    return filedialog.askopenfilename()
+
 
+# *****************************************************************
+# *****************************************************************
+# Main
+# Analyze one or more backups and write the reports for each.
+# With more than one backup, each backup's reports go in a subdirectory of the output directory named after the backup.
+def Main(argv=None):
+    parser=argparse.ArgumentParser(description="Find the most wanted (referenced but missing) pages in Wikidot backups")
+    parser.add_argument("archives", nargs="*", help="the backups to analyze: zip files, directories they have been unpacked into, or tar.gz files of those directories "
+                                                    "(if none are given, a file dialog asks for a zip file)")
+    parser.add_argument("--output-dir", default=".", help="where to write the reports and log (default: the current directory)")
+    parser.add_argument("--workers", type=int, default=None, help="the number of worker processes (default: one per CPU)")
+    parser.add_argument("--mmap", action="store_true", help="read the pages of an unpacked backup through mmap")
+    parser.add_argument("--cache", default="WantedPagesCache.sqlite", help="the page cache file")
+    parser.add_argument("--full", action="store_true", help="ignore (and rebuild) the page cache")
+    parser.add_argument("--verify-cache", action="store_true", help="check that the pages taken from the cache match a fresh scan")
+    parser.add_argument("--referenced-threshold", type=int, default=7, help="list pages in Most Referenced Pages only if they have more references than this (default: 7)")
+    parser.add_argument("--wanted-threshold", type=int, default=5, help="list pages in Most Wanted Pages only if they have more references than this (default: 5)")
+    parser.add_argument("--trace-memory", action="store_true", help="track peak memory by phase with tracemalloc (slow)")
+    parser.add_argument("--profile", action="store_true", help="profile the run with cProfile, writing '<date> Profile.pstats' next to the reports")
+    parser.add_argument("--top-k", type=int, default=None, help="stop each ranked report once this many pages have been listed")
+    parser.add_argument("--important-count", type=int, default=100, help="the number of pages listed in Most Important Wanted Pages (default: 100)")
+    parser.add_argument("--no-importance", action="store_true", help="skip the importance ranking and the Most Important Wanted Pages report")
+    parser.add_argument("--filters", default=PageFilter.defaultRulesFilepath, help="the rules file which says which pages to ignore (default: PageFilters.txt)")
+    parser.add_argument("--diff", action="store_true", help="instead of the usual reports, write a Wanted Pages Changes report comparing each archive with the one before it")
+    parser.add_argument("--since", default=None, help="with --diff, a graph snapshot to compare the first archive with")
+    parser.add_argument("--save-snapshot", action="store_true", help="save a graph snapshot ('<date> Graph Snapshot.sqlite') next to the reports, for a later --diff --since")
+    args=parser.parse_args(argv)
+
+    archives=args.archives
+    if len(archives) == 0:
+        zipFilepath=AskForZipFilepath()
+        if not zipFilepath:
+            return 1
+        archives=[zipFilepath]
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    options=AnalysisOptions(workers=args.workers, cacheFilepath=args.cache, fullRebuild=args.full, verifyCache=args.verify_cache, traceMemory=args.trace_memory, profile=args.profile,
+                            keepState=args.save_snapshot, useMmap=args.mmap, rankImportance=not args.no_importance)
+    try:
+        options.pageFilter=PageFilter.LoadPageFilter(args.filters)
+    except (OSError, ValueError) as e:
+        print("ERROR: " + str(e))
+        return 1
+
+    # The page cache, the worker pool and the cannonicization caches stay warm from one archive to the next
+    options.cache=PageCache.PageCache(options.cacheFilepath)
+    options.pool=ProcessPoolExecutor(max_workers=options.workers)
+    status=0
+    try:
+        if args.diff:
+            OpenLog(os.path.join(args.output_dir, "log.txt"))
+            day=time.strftime("%Y-%m-%d")
+            try:
+                state=DiffArchives(archives, options, args.output_dir, args.since, day)
+            except (Archives.ArchiveError, GraphSnapshot.SnapshotError) as e:
+                logger("ERROR: " + str(e))
+                return 1
+            if args.save_snapshot:
+                GraphSnapshot.SaveSnapshot(state, os.path.join(args.output_dir, day+" Graph Snapshot.sqlite"), state.names)
+            return 0
+
+        for archivePath in archives:
+            outputDir=args.output_dir
+            if len(archives) > 1:
+                outputDir=os.path.join(outputDir, Archives.ArchiveName(archivePath))
+                os.makedirs(outputDir, exist_ok=True)
+            OpenLog(os.path.join(outputDir, "log.txt"))
+            try:
+                result=Analyze(archivePath, options)
+            except Archives.ArchiveError as e:
+                logger("ERROR: " + str(e))
+                status=1
+                continue
+            day=time.strftime("%Y-%m-%d")
+            with result.metrics.Phase("reports"):
+                Reports.WriteReports(result, outputDir, day, referencedThreshold=args.referenced_threshold, wantedThreshold=args.wanted_threshold, topK=args.top_k, importantCount=args.important_count)
+            result.metrics.Stop()
+            result.metrics.FlushWarnings()
+            result.metrics.WriteJson(os.path.join(outputDir, day+" Metrics.json"))
+            result.metrics.WriteProfile(os.path.join(outputDir, day+" Profile.pstats"))
+            if result.state != None:
+                GraphSnapshot.SaveSnapshot(result.state, os.path.join(outputDir, day+" Graph Snapshot.sqlite"), result.names)
+            options.fullRebuild=False   # Once is enough
+    finally:
+        CloseLog()
+        options.pool.shutdown()
+        options.cache.Close()
+    return status
+
+
+# The guard matters: the scan's worker processes import this module.
+if __name__ == "__main__":
+    sys.exit(Main())
@@ -1,46 +1,61 @@
 # A package to support API access to Wikidot
 
+import functools
+import re
+import unicodedata
+
 # *****************************************************************
 # Return a Wikidot cannonicized version of a name
 # The cannonicized name turns all spans of non-alphanumeric characters into a single hyphen, drops all leading and trailing hyphens
 # and turns all alphabetic characters to lower case
 # A Raw name is a single string possibly including a category: prefix
-cannonicalToReal = {}   # A dictionary which lets us go from cannonical names back to real names
+# (Going back from cannonical names to real names is the job of a NameRegistry, below.)
+
+
+# Letters which don't decompose into a base letter plus accents, but which still have a conventional ASCII spelling
+extraFoldings={"ß" : "ss", "æ" : "ae", "Æ" : "AE", "ø" : "o", "Ø" : "O", "œ" : "oe", "Œ" : "OE", "đ" : "d", "Đ" : "D",
+               "ł" : "l", "Ł" : "L", "þ" : "th", "Þ" : "TH", "ð" : "d", "Ð" : "D", "ı" : "i"}
+
+# These are the foldings we have always used.  They take precedence over the generic ones (e.g., "ö" is "oe", not "o")
+funnyForeignCharacters={"é" : "e",
+                        "É" : "E",
+                        "ë" : "e",
+                        "Ó" : "O",
+                        "ö" : "oe",
+                        "è" : "e",
+                        "í" : "i"}
 
 
-# We need to convert a string to Wikidot's cannonical form: All lower case; All spans of special characters reduced to a hyphen; No leading ro trailing hyphens.
-# The strategy is to iterate through the name, copying characters to a list of characters which is later merged into the return string. (Appending to a string is too expensive.)
+# *****************************************************************
+# Build the str.translate() table which folds accented Latin letters to plain ASCII
+# A letter is folded if its compatibility decomposition is an ASCII letter followed by combining marks.
+def BuildFoldingTable():
+    table={}
+    for code in list(range(0xC0, 0x250))+list(range(0x1E00, 0x1F00)):     # Latin-1 Supplement, Latin Extended-A and -B, Latin Extended Additional
+        c=chr(code)
+        base="".join(x for x in unicodedata.normalize("NFKD", c) if not unicodedata.combining(x))
+        if base != c and len(base) > 0 and base.isascii() and base.isalpha():
+            table[code]=base
+    for c, folded in extraFoldings.items():
+        table[ord(c)]=folded
+    for c, folded in funnyForeignCharacters.items():
+        table[ord(c)]=folded
+    return table
+
+foldingTable=BuildFoldingTable()
+
+# A run of alphanumerics and ":"s (":", the category separator, is an honorary alphanumeric)
+alnumPattern=re.compile(r"(?:[^\W_]|:)+")
+
+
+# We need to convert a string to Wikidot's cannonical form: All lower case; All spans of special characters reduced to a hyphen; No leading or trailing hyphens.
+# Accented letters are folded to ASCII and then the runs of alphanumerics are joined with hyphens.  Results are memoized, since the same names turn up over and over.
+@functools.lru_cache(maxsize=1<<18)
 def CannonicizeString(name):
-    funnyForeignCharacters={"é" : "e",
-                            "É" : "E",
-                            "ë" : "e",
-                            "Ó" : "O",
-                            "ö" : "oe",
-                            "è" : "e",
-                            "í" : "i"}
-    out = []
-    inAlpha = False
-    inJunk = False
-    for c in name:
-        if c in funnyForeignCharacters.keys():
-            c=funnyForeignCharacters[c]
-        if c.isalnum() or c == ':':     # ":", the category separator, is an honorary alphanumeric
-            if inJunk:
-                out.append("-")
-            out.append(c)
-            inJunk = False
-            inAlpha = True
-        else:
-            inJunk = True
-            inAlpha = False
-    # Remove any leading or trailing "-"
-    canname=''.join(out)
-    if len(canname) > 1:
-        if canname[0] == "-":
-            canname=canname[1:]
-        if canname[:-1] == "-":
-            canname=canname[:-1]
-    return canname
+    if not name.isascii():
+        name=name.translate(foldingTable)
+    return "-".join(alnumPattern.findall(name))
+
 
 # Take a raw name (mixed case, special characters, a potential category, etc.) and turn it into a properly formatted cannonicized name:
 #       Either "<category>:<name>" or, when there is no category, just "<name>"
@@ -48,6 +63,12 @@ def CannonicizeString(name):
 def CannonicizeZipName(pageNameZip):
     if pageNameZip == None:
         return None
+    return CannonicalAndRealNames(pageNameZip)[0]
+
+
+# Return the pair (cannonicized name, lower-cased raw name).  This is the memoized part of CannonicizeZipName.
+@functools.lru_cache(maxsize=1<<18)
+def CannonicalAndRealNames(pageNameZip):
     pageName = pageNameZip.lower()
 
     # Split out the category, if any.
@@ -57,53 +78,116 @@ def CannonicizeZipName(pageNameZip):
 
     # Handle the case of no category
     if len(splitName) == 1:
-        canName=CannonicizeString(splitName[0])
-        name=splitName[0]
-    else:
-        canName=CannonicizeString(splitName[0])+":"+CannonicizeString(splitName[1])
-        name=splitName[0]+":"+splitName[1]
-
-    # And save the cannocized and raw versions of the name in a reverse-lookup dictionary
-    if cannonicalToReal.get(canName) == None:
-        cannonicalToReal[canName]=name  # Add this cannonical-to-real conversion to the dictionary
-    return canName
+        return CannonicizeString(splitName[0]), splitName[0]
+    return CannonicizeString(splitName[0])+":"+CannonicizeString(splitName[1]), splitName[0]+":"+splitName[1]
 
 
 # *****************************************************************
-# Potentially add this entry to the list of uncannonicized page names
-def AddUncannonicalName(uncanName, canName):
-    if cannonicalToReal.get(canName) == None:
-        cannonicalToReal[canName]=uncanName
-    else:
-        if ([x.isupper() for x in uncanName].count(True) > [x.isupper() for x in cannonicalToReal[canName]].count(True)):
-            cannonicalToReal[canName]=uncanName
+# Hit and miss counts for the cannonicization memo caches
+def CannonicizeCacheInfo():
+    return {"CannonicizeString": CannonicizeString.cache_info(), "CannonicalAndRealNames": CannonicalAndRealNames.cache_info()}
 
 
 # *****************************************************************
+# The last resort for turning a cannonical name back into something readable: remove the internal hyphens
+# (We need to do better here!)
 def UncannonicizeZipName(name):
-    n=cannonicalToReal.get(name)
-    if n != None:
-        return n
-
-    # OK, this is most likely the name of a redirect page.  The best we can do is to remove internal hyphens.
-    # (We need to do better here!)
     return name.replace("-", "")
 
 
+# *****************************************************************
+# The display names for one run: which real spelling to show for each cannonical name
+# The spellings are counted as the names turn up.  There are two kinds:
+#   written:    a name as an editor wrote it, in a reference or as a redirect's destination
+#   page names: a page's (or redirect's) own name, from its zip entry
+# The best spelling for a name is its most often written one (ties go to the one with more capitals, then to the one seen first).
+# A name which is never written gets its page name, and a name which is neither gets UncannonicizeZipName().
+# Finish() makes the choices once and for all, and lets go of the counts.
+class NameRegistry:
+    def __init__(self):
+        self.written={}         # Cannonical name -> [spelling, count] while it has only been written one way, then a dictionary {spelling: count}
+        self.pageNames={}       # Cannonical name -> the lower-cased page name (just the cannonical name itself when they're the same)
+        self.chosen=None        # Cannonical name -> display name, once Finish() has been called
+
+    # Note a page's own name.  Returns its cannonical name.
+    def AddPageName(self, pageNameZip):
+        canName, name=CannonicalAndRealNames(pageNameZip)
+        if canName not in self.pageNames:
+            self.pageNames[canName]=canName if name == canName else name
+        return canName
+
+    # Note a name as written.  Returns its cannonical name.  (The cannonical name can be given, if it's already known.)
+    def AddWritten(self, written, canName=None):
+        if canName == None:
+            canName=CannonicalAndRealNames(written)[0]
+        spellings=self.written.get(canName)
+        if spellings == None:
+            self.written[canName]=[written, 1]
+        elif type(spellings) == list:
+            if spellings[0] == written:
+                spellings[1]+=1
+            else:
+                self.written[canName]={spellings[0]: spellings[1], written: 1}
+        else:
+            spellings[written]=spellings.get(written, 0)+1
+        return canName
+
+    def Best(self, canName):
+        spellings=self.written.get(canName)
+        if spellings == None:
+            name=self.pageNames.get(canName)
+            if name == None:
+                return UncannonicizeZipName(canName)
+            return name
+        if type(spellings) == list:
+            return spellings[0]
+        return max(spellings.items(), key=lambda x: (x[1], sum(1 for c in x[0] if c.isupper())))[0]    # max() keeps the first of equals
+
+    # Choose the display name for every name seen so far
+    def Finish(self):
+        self.chosen={canName: self.Best(canName) for canName in (*self.pageNames, *self.written)}
+        self.written={}
+        self.pageNames={}
+
+    def DisplayName(self, canName):
+        if self.chosen == None:
+            return self.Best(canName)
+        name=self.chosen.get(canName)
+        if name == None:
+            return UncannonicizeZipName(canName)
+        return name
+
+    # (cannonical name, display name) for every name the registry knows
+    def Items(self):
+        if self.chosen != None:
+            return self.chosen.items()
+        return {canName: self.Best(canName) for canName in (*self.pageNames, *self.written)}.items()
+
+
 # *****************************************************************
 # Is the page a redirect?  If yes, return the cannonicized redirect; if not, return null
 # A redirect is of the form [[module Redirect destination="<dest>"]]
 # We want to return the cannonicized destination or None if it is not a redirect
 def IsRedirect(pageText):
+    redir=RedirectTarget(pageText)
+    if redir != None:
+        return CannonicizeZipName(redir)
+    return None
+
+
+# *****************************************************************
+# Is the page a redirect?  If yes, return the raw (uncannonicized) redirect destination; if not, return None
+def RedirectTarget(pageText):
     pageText = pageText.strip()  # Remove leading and trailing whitespace
     if pageText.lower().startswith('[[module redirect destination="') and pageText.endswith('"]]'):
-        return CannonicizeZipName(pageText[31:].rstrip('"]'))
+        return pageText[31:].rstrip('"]')
     return None
 
 
 # *****************************************************************
-# Should this filename be ignored?
+# Is this zip entry a page's source at all?
 # Return value is either the cleaned filename or None if the file should be ignored.
+# (Which pages are worth looking at is wiki-dependent.  That's decided by the rules in the PageFilter, not here.)
 def InterestingFilenameZip(filenameZip):
 
     if not filenameZip.startswith("source/"):    # We're only interested in source files
@@ -111,24 +195,14 @@ def InterestingFilenameZip(filenameZip):
     if len(filenameZip) <= 11:  # There needs to be something there besides 'source/.txt'
            return None
 
-    # These files are specific to Fancyclopedia and are known to be ignorable
-    if filenameZip.startswith("source/index_people"):  # Pages with names "source/index_people..." are index pages, not content pages.
-        return None
-    if filenameZip.startswith("source/index_alphanumeric"):  # Likewise
-        return None
-    if filenameZip.startswith("source/testing_alphanumeric"):  # Likewise
-        return None
-
     return filenameZip[7:-4]  # Drop "source/" and ".txt", returning the cleaned name
 
 
 # *****************************************************************
 # Read a source file from a zipped Wikidot backup
+# The entry should already have been checked by InterestingFilenameZip (or a PageFilter): it isn't checked again here.
 def ReadPageSourceFromZip(zip, filename):
 
-    if InterestingFilenameZip(filename) == None:
-        return None
-
     source = zip.read(filename).decode("utf-8")
     if source == None:
         print("error: '" + filename + "' read as None")
@@ -136,8 +210,7 @@ def ReadPageSourceFromZip(zip, filename):
     return source
 
 # *****************************************************************
-# Convert the filename in a zipped Wikidot backup (which uses "_" to indicate a category) to use a Wikidot ":" category indicator
+# Convert a page's name as it is in a zipped Wikidot backup (which uses "_" to indicate a category) to use a Wikidot ":" category indicator
+# The name is the one InterestingFilenameZip (or a PageFilter) returns, without the "source/" and ".txt": "fan_bob-tucker" becomes "fan:bob-tucker".
 def ConvertZipCategoryMarker(name):
-    if not name.startswith("source/"):  # Only source files can have categories.  (I think.)
-        return name
     return name.replace("_", ":")
\ No newline at end of file